@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its measures include the rest of the middleware
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,16 +81,89 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# Connections stay open for DB_CONN_MAX_AGE seconds (0 closes them at the
+# end of each request) and a reused one is checked before its first query
+# of each request. With DB_POOL_SIZE the connections closed by the threads
+# of each process are kept open in a pool instead, see
+# core/db/backends/postgresql
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Threads give their connection back to the pool after each request
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if DB_POOL_SIZE else 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'POOL': {
+            'MAX_SIZE': DB_POOL_SIZE,
+            # Seconds to wait for a connection when all are in use
+            'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        } if DB_POOL_SIZE else None,
+    }
+}
+
+# Running the test suite
+TESTING = sys.argv[1:2] == ['test']
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Token authentication cache
+# Keeps the user of recently seen tokens to skip the per-request query.
+# Entries kept by each process are only dropped by the process deleting
+# the token or changing the user, the others accept them up to TTL
+# seconds longer. A cache shared by the processes drops them for all, it
+# is used by default when the default cache is not local to the process
+
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+    # CACHES alias to share the entries between processes, when set
+    'CACHE_ALIAS': os.environ.get(
+        'TOKEN_AUTH_CACHE_ALIAS',
+        None if CACHES['default']['BACKEND'].endswith('LocMemCache')
+        else 'default'
+    ) or None,
+}
+
+# Token issuance throttling
+# Token requests are limited per email and per client IP with token
+# buckets: CAPACITY requests at once, refilled by PER_MINUTE each minute.
+# The buckets are kept by each process, unless CACHE_ALIAS names a cache
+# shared by the processes. Off in the test suite unless a test enables it
+
+TOKEN_THROTTLE = {
+    'ENABLED': os.environ.get('TOKEN_THROTTLE', '0' if TESTING else '1') == '1',
+    'RATES': {
+        'email': {
+            'CAPACITY': int(os.environ.get('TOKEN_THROTTLE_EMAIL_CAPACITY', 5)),
+            'PER_MINUTE': int(os.environ.get('TOKEN_THROTTLE_EMAIL_RATE', 5)),
+        },
+        'ip': {
+            'CAPACITY': int(os.environ.get('TOKEN_THROTTLE_IP_CAPACITY', 20)),
+            'PER_MINUTE': int(os.environ.get('TOKEN_THROTTLE_IP_RATE', 20)),
+        },
+    },
+    # Buckets kept by each process
+    'MAX_SIZE': int(os.environ.get('TOKEN_THROTTLE_SIZE', 100000)),
+    'CACHE_ALIAS': os.environ.get('TOKEN_THROTTLE_CACHE_ALIAS'),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -106,6 +182,36 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# New passwords are hashed with PASSWORD_HASHER. The hashes of the other
+# hashers, or of the same one with another cost, are still checked and
+# replaced on the next login. The test suite uses the fast MD5 hasher,
+# never use it in production. Argon2 needs argon2-cffi, bcrypt needs bcrypt
+
+PASSWORD_HASHING = {
+    'HASHER': os.environ.get('PASSWORD_HASHER', 'md5' if TESTING else 'pbkdf2'),
+    'PBKDF2_ITERATIONS': int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 260000)),
+    'ARGON2_TIME_COST': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)),
+    # KiB of memory of each hash
+    'ARGON2_MEMORY_COST': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 102400)),
+    'ARGON2_PARALLELISM': int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 8)),
+    'BCRYPT_ROUNDS': int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12)),
+}
+
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'md5': 'django.contrib.auth.hashers.MD5PasswordHasher',
+}
+
+# The first hasher hashes the new passwords, MD5 hashes are only
+# checked when it is the chosen one
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHING['HASHER']]] + [
+    path for name, path in _PASSWORD_HASHERS.items()
+    if name not in (PASSWORD_HASHING['HASHER'], 'md5')
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -131,3 +237,93 @@ MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
+
+# Django REST framework
+# The JSON renderer and parser use orjson when it is installed
+
+REST_FRAMEWORK = {
+    # Without BasicAuthentication, that would hash the password of every
+    # request sending one, before the throttles of the token view run
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework.authentication.SessionAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Proxies in front of the servers, the client IP of the throttles is
+    # read from X-Forwarded-For only behind them. 0 uses REMOTE_ADDR, as
+    # the header is sent by the clients themselves without a proxy
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Request measures, sent as Server-Timing headers and counted per view
+# Each process shares its histograms through the cache every interval
+# (seconds), a shared cache backend shows the requests of every process.
+# The histograms of a process expire PROCESS_TTL seconds after it last
+# published them, so stopped processes drop out of the measures
+
+REQUEST_METRICS = {
+    'ENABLED': os.environ.get('REQUEST_METRICS', '1') == '1',
+    'CACHE_ALIAS': 'default',
+    'PUBLISH_INTERVAL': int(
+        os.environ.get('REQUEST_METRICS_PUBLISH_INTERVAL', 10)
+    ),
+    'PROCESS_TTL': int(os.environ.get('REQUEST_METRICS_PROCESS_TTL', 3600)),
+}
+
+# Book image processing
+# Thumbnails are made by a queue of workers after the upload returns
+
+BOOK_IMAGE_QUEUE = os.environ.get(
+    'BOOK_IMAGE_QUEUE',
+    'book.images.ThreadPoolQueue'
+)
+BOOK_IMAGE_WORKERS = int(os.environ.get('BOOK_IMAGE_WORKERS', 2))
+BOOK_IMAGE_THUMBNAIL_SIZES = [(128, 128), (512, 512)]
+
+# Book API pagination
+# Only applied when the client sends a cursor or a page_size parameter
+
+BOOK_PAGE_SIZE = int(os.environ.get('BOOK_PAGE_SIZE', 50))
+BOOK_MAX_PAGE_SIZE = int(os.environ.get('BOOK_MAX_PAGE_SIZE', 500))
+
+# Text search configuration of the book full-text search (Postgres)
+BOOK_SEARCH_CONFIG = os.environ.get('BOOK_SEARCH_CONFIG', 'english')
+
+# Suggestions sent by the tag and author autocomplete
+BOOK_AUTOCOMPLETE_LIMIT = 10
+BOOK_AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Build the book list from plain rows instead of the serializer fields,
+# the response is the same but takes less time to make
+
+BOOK_FAST_LIST = os.environ.get('BOOK_FAST_LIST', '0') == '1'
+
+# Rows written per statement by the bulk endpoints
+BOOK_BULK_BATCH_SIZE = int(os.environ.get('BOOK_BULK_BATCH_SIZE', 1000))
+# Books accepted by a request to the bulk endpoint, all written in one
+# transaction
+BOOK_BULK_MAX_SIZE = int(os.environ.get('BOOK_BULK_MAX_SIZE', 5000))
+
+# Books read per query by the export endpoint
+BOOK_EXPORT_CHUNK_SIZE = int(os.environ.get('BOOK_EXPORT_CHUNK_SIZE', 2000))
+
+# Book API response cache
+# List responses are cached per user and invalidated on every write. The
+# ETags are built from the same versions. A write only invalidates the
+# cache of the processes sharing it, so both are off unless BOOK_CACHE_ALIAS
+# names a cache shared by the processes. The test suite runs in a single
+# process, so it keeps the local cache
+
+BOOK_CACHE_ALIAS = os.environ.get(
+    'BOOK_CACHE_ALIAS',
+    None if CACHES['default']['BACKEND'].endswith('LocMemCache')
+    and not TESTING else 'default'
+) or None
+BOOK_CACHE_TIMEOUT = int(os.environ.get('BOOK_CACHE_TIMEOUT', 300))
@@ -0,0 +1,69 @@
+"""Compare the assigned_only filter on tags: JOIN + DISTINCT vs EXISTS"""
+from django.db.models import Exists, OuterRef
+
+from core.models import Tag, Book
+
+from benchmarks.utils import measure, sample_user
+
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Tags linked to every book, the rest of the links come from more books
+TAGS_PER_BOOK = 10
+
+
+def seed(user, links):
+    """Create books and tags joined by the given number of links"""
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}') for i in range(TAGS_PER_BOOK * 10)
+    )
+    books = Book.objects.bulk_create(
+        Book(user=user, title=f'Book {i}', pages=100, year=2000, price=1)
+        for i in range(links // TAGS_PER_BOOK)
+    )
+    Book.tags.through.objects.bulk_create(
+        (
+            Book.tags.through(book_id=book.id, tag_id=tag.id)
+            for i, book in enumerate(books)
+            for tag in tags[i % 10::10][:TAGS_PER_BOOK]
+        ),
+        batch_size=5000
+    )
+
+
+def distinct_queryset(user):
+    """Return the assigned tags joining books and removing duplicates"""
+    return Tag.objects.filter(
+        user=user,
+        book__isnull=False
+    ).order_by('-name').distinct()
+
+
+def exists_queryset(user):
+    """Return the assigned tags checking the through table with EXISTS"""
+    links = Book.tags.through.objects.filter(tag_id=OuterRef('pk'))
+    return Tag.objects.filter(Exists(links), user=user).order_by('-name')
+
+
+def run(stdout, sizes=None, repeat=5):
+    """Time both querysets for every number of links"""
+    results = []
+    for index, links in enumerate(sizes or DEFAULT_SIZES):
+        user = sample_user(f'assigned{index}@email.com')
+        seed(user, links)
+        result = {'links': links}
+        for name, queryset in (
+            ('distinct', distinct_queryset),
+            ('exists', exists_queryset),
+        ):
+            result[f'{name}_ms'] = measure(
+                lambda: list(queryset(user)),
+                repeat
+            )
+        stdout.write(
+            f'{links:>8} links  '
+            f'distinct {result["distinct_ms"]:8.2f} ms  '
+            f'exists {result["exists_ms"]:8.2f} ms'
+        )
+        results.append(result)
+
+    return results
@@ -0,0 +1,82 @@
+"""Compare listing books through BookSerializer and from plain rows"""
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Author, Book
+
+from book import cache
+
+from benchmarks.utils import measure, sample_user
+
+
+DEFAULT_SIZES = (1000, 10000)
+TAGS_PER_BOOK = 3
+
+
+def seed(user, books):
+    """Create books with a few tags and an author each"""
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}') for i in range(20)
+    )
+    authors = Author.objects.bulk_create(
+        Author(user=user, name=f'Author {i}') for i in range(20)
+    )
+    created = Book.objects.bulk_create(
+        (
+            Book(user=user, title=f'Book {i}', pages=100, year=2000,
+                 price=9.99)
+            for i in range(books)
+        ),
+        batch_size=5000
+    )
+    Book.tags.through.objects.bulk_create(
+        (
+            Book.tags.through(book_id=book.id, tag_id=tag.id)
+            for i, book in enumerate(created)
+            for tag in tags[i % 17:i % 17 + TAGS_PER_BOOK]
+        ),
+        batch_size=5000
+    )
+    Book.authors.through.objects.bulk_create(
+        (
+            Book.authors.through(book_id=book.id,
+                                 author_id=authors[i % 20].id)
+            for i, book in enumerate(created)
+        ),
+        batch_size=5000
+    )
+
+
+def run(stdout, sizes=None, repeat=5):
+    """Time a full list request of every number of books"""
+    url = reverse('book:book-list')
+    results = []
+    for index, books in enumerate(sizes or DEFAULT_SIZES):
+        user = sample_user(f'list{index}@email.com')
+        seed(user, books)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        result = {'books': books}
+        for name, fast_list in (('serializer', False), ('rows', True)):
+            def list_books():
+                # Build the response every time instead of reading it
+                cache.invalidate_user(user.id)
+                client.get(url)
+
+            with override_settings(BOOK_FAST_LIST=fast_list):
+                result[f'{name}_ms'] = measure(list_books, repeat)
+            result[f'{name}_rows_per_s'] = books * 1000 / \
+                result[f'{name}_ms']
+        stdout.write(
+            f'{books:>8} books  '
+            f'serializer {result["serializer_ms"]:8.2f} ms '
+            f'({result["serializer_rows_per_s"]:.0f} rows/s)  '
+            f'rows {result["rows_ms"]:8.2f} ms '
+            f'({result["rows_rows_per_s"]:.0f} rows/s)'
+        )
+        results.append(result)
+
+    return results
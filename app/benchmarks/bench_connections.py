@@ -0,0 +1,101 @@
+"""Compare the request latency of new, persistent and pooled connections
+
+Requests go through the WSGI handler in this thread, as in a worker of
+a WSGI server, so Django closes or keeps the connection between them as
+it does in production.
+"""
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Book
+from core.db.backends.postgresql.base import close_pools
+
+from benchmarks.utils import measure, sample_user
+
+
+DEFAULT_SIZES = (100, 1000)
+# Settings of the connection of each configuration
+CONFIGS = (
+    ('new', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'POOL': None}),
+    ('persistent', {
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': False,
+        'POOL': None,
+    }),
+    ('checked', {
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': None,
+    }),
+    ('pooled', {
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 10},
+    }),
+)
+
+
+def _start_response(status, headers):
+    pass
+
+
+def run(stdout, sizes=None, repeat=5):
+    """Time the given number of requests with every configuration"""
+    user = sample_user()
+    token = Token.objects.create(user=user)
+    book = Book.objects.create(
+        user=user,
+        title='Book',
+        pages=100,
+        year=2000,
+        price=9.99
+    )
+    # The token is cached, the book is read on every request
+    environ = RequestFactory().get(
+        reverse('book:book-detail', args=[book.id]),
+        HTTP_AUTHORIZATION=f'Token {token.key}'
+    ).environ
+    handler = WSGIHandler()
+
+    def request():
+        response = handler(environ, _start_response)
+        # Sends request_finished, closing the connection unless kept
+        response.close()
+
+    request()
+    with CaptureQueriesContext(connection) as context:
+        request()
+    stdout.write(f'{len(context)} queries per request')
+
+    original = dict(connection.settings_dict)
+    results = []
+    try:
+        for requests in sizes or DEFAULT_SIZES:
+            result = {'requests': requests}
+            for name, config in CONFIGS:
+                connection.close()
+                connection.settings_dict.update(config)
+                request()
+                result[f'{name}_ms'] = measure(
+                    lambda: [request() for _ in range(requests)],
+                    repeat
+                ) / requests
+            stdout.write(
+                f'{requests:>8} requests  ' + '  '.join(
+                    f'{name} {result[f"{name}_ms"]:6.2f} ms'
+                    for name, _ in CONFIGS
+                ) + '  connection setup '
+                f'{result["new_ms"] - result["persistent_ms"]:6.2f} ms'
+            )
+            results.append(result)
+    finally:
+        connection.close()
+        connection.settings_dict.update(original)
+        close_pools()
+
+    return results
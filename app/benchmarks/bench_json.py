@@ -0,0 +1,55 @@
+"""Compare encoding and decoding book payloads with json and orjson"""
+import io
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Book
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+from book.serializers import BookDetailSerializer
+
+from benchmarks.bench_book_list import seed
+from benchmarks.utils import measure, sample_user
+
+
+DEFAULT_SIZES = (1000, 10000)
+
+
+def run(stdout, sizes=None, repeat=5):
+    """Time rendering and parsing the details of every number of books"""
+    results = []
+    for index, books in enumerate(sizes or DEFAULT_SIZES):
+        user = sample_user(f'json{index}@email.com')
+        seed(user, books)
+        # The details have nested objects, datetimes and decimals
+        data = BookDetailSerializer(
+            Book.objects.filter(user=user).prefetch_related('tags', 'authors'),
+            many=True
+        ).data
+        body = JSONRenderer().render(data)
+
+        result = {'books': books, 'bytes': len(body)}
+        for name, renderer, parser in (
+            ('json', JSONRenderer(), JSONParser()),
+            ('fast', FastJSONRenderer(), FastJSONParser()),
+        ):
+            result[f'{name}_render_ms'] = measure(
+                lambda: renderer.render(data),
+                repeat
+            )
+            result[f'{name}_parse_ms'] = measure(
+                lambda: parser.parse(io.BytesIO(body)),
+                repeat
+            )
+        stdout.write(
+            f'{books:>8} books ({len(body)} bytes)  '
+            f'render: json {result["json_render_ms"]:8.2f} ms '
+            f'fast {result["fast_render_ms"]:8.2f} ms  '
+            f'parse: json {result["json_parse_ms"]:8.2f} ms '
+            f'fast {result["fast_parse_ms"]:8.2f} ms'
+        )
+        results.append(result)
+
+    return results
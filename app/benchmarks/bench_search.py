@@ -0,0 +1,59 @@
+"""Time the full-text search of books over growing libraries"""
+import random
+
+from core.models import Book
+
+from book.search import search_books
+
+from benchmarks.utils import measure, sample_user
+
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+WORDS = (
+    'war', 'peace', 'history', 'garden', 'night', 'river', 'empire',
+    'shadow', 'winter', 'journey', 'secret', 'ocean', 'city', 'king',
+)
+BATCH_SIZE = 10000
+
+
+def seed(user, books):
+    """Create books with random titles and index them"""
+    for start in range(0, books, BATCH_SIZE):
+        created = Book.objects.bulk_create(
+            Book(
+                user=user,
+                title=' '.join(random.sample(WORDS, 3)),
+                pages=100,
+                year=2000,
+                price=1
+            )
+            for _ in range(min(BATCH_SIZE, books - start))
+        )
+        Book.objects.update_search_vectors(book.pk for book in created)
+
+
+def run(stdout, sizes=None, repeat=5):
+    """Time a search returning the first page of results"""
+    random.seed(0)
+    user = sample_user()
+    seeded = 0
+    results = []
+    for books in sorted(sizes or DEFAULT_SIZES):
+        seed(user, books - seeded)
+        seeded = books
+        queryset = Book.objects.filter(user=user).order_by('-id')
+        result = {'books': books}
+        for text in ('winter', 'winter garden night'):
+            result[text] = measure(
+                lambda: list(search_books(queryset, text, user)[:50]),
+                repeat
+            )
+        stdout.write(
+            f'{books:>8} books  ' + '  '.join(
+                f'{text!r} {result[text]:8.2f} ms'
+                for text in ('winter', 'winter garden night')
+            )
+        )
+        results.append(result)
+
+    return results
@@ -0,0 +1,108 @@
+"""Compare filtering books on many tags: joins vs EXISTS and HAVING COUNT"""
+import random
+
+from core.models import Tag, Book
+
+from book import filters
+
+from benchmarks.utils import measure, sample_user
+
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+TAGS = 100
+TAGS_PER_BOOK = 10
+# Number of tags in the filter of every query
+FILTER_TAGS = 12
+
+
+def seed(user, books):
+    """Create books linked to random tags, return the ids of the tags"""
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}') for i in range(TAGS)
+    )
+    created = Book.objects.bulk_create(
+        (
+            Book(user=user, title=f'Book {i}', pages=100, year=2000, price=1)
+            for i in range(books)
+        ),
+        batch_size=5000
+    )
+    rand = random.Random(books)
+    Book.tags.through.objects.bulk_create(
+        (
+            Book.tags.through(book_id=book.id, tag_id=tag.id)
+            for book in created
+            for tag in rand.sample(tags, TAGS_PER_BOOK)
+        ),
+        batch_size=5000
+    )
+
+    return [tag.id for tag in tags]
+
+
+def join_any(user, tag_ids):
+    """Return the books with any tag joining the links"""
+    return Book.objects.filter(user=user, tags__id__in=tag_ids)
+
+
+def join_all(user, tag_ids):
+    """Return the books with every tag joining the links once per tag"""
+    queryset = Book.objects.filter(user=user)
+    for tag_id in tag_ids:
+        queryset = queryset.filter(tags__id=tag_id)
+
+    return queryset
+
+
+def exists_any(user, tag_ids):
+    """Return the books with any tag checking the links with EXISTS"""
+    return filters.filter_related(
+        Book.objects.filter(user=user),
+        Book.tags.field,
+        tag_ids,
+        filters.MATCH_ANY
+    )
+
+
+def having_all(user, tag_ids):
+    """Return the books with every tag counting their links"""
+    return filters.filter_related(
+        Book.objects.filter(user=user),
+        Book.tags.field,
+        tag_ids,
+        filters.MATCH_ALL
+    )
+
+
+def run(stdout, sizes=None, repeat=5):
+    """Time the matches of both modes for every number of books"""
+    results = []
+    for index, books in enumerate(sizes or DEFAULT_SIZES):
+        user = sample_user(f'match{index}@email.com')
+        tag_ids = seed(user, books)[:FILTER_TAGS]
+        result = {'books': books}
+        for name, queryset in (
+            ('join_any', join_any),
+            ('exists_any', exists_any),
+            ('join_all', join_all),
+            ('having_all', having_all),
+        ):
+            result[f'{name}_rows'] = queryset(user, tag_ids).count()
+            result[f'{name}_ms'] = measure(
+                lambda: list(
+                    queryset(user, tag_ids).order_by('-id').values('id')
+                ),
+                repeat
+            )
+        stdout.write(
+            f'{books:>8} books  '
+            f'any: join {result["join_any_ms"]:8.2f} ms '
+            f'({result["join_any_rows"]} rows) '
+            f'exists {result["exists_any_ms"]:8.2f} ms '
+            f'({result["exists_any_rows"]} rows)  '
+            f'all: join {result["join_all_ms"]:8.2f} ms '
+            f'having {result["having_all_ms"]:8.2f} ms'
+        )
+        results.append(result)
+
+    return results
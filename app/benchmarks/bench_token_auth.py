@@ -0,0 +1,54 @@
+"""Compare the per-request cost of token and cached token authentication"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from user.authentication import CachedTokenAuthentication, reset_token_cache
+
+from benchmarks.utils import measure, sample_user
+
+
+DEFAULT_SIZES = (1000, 10000)
+
+
+def run(stdout, sizes=None, repeat=5):
+    """Time authenticating the given number of requests"""
+    token = Token.objects.create(user=sample_user())
+    request = Request(APIRequestFactory().get(
+        '/',
+        HTTP_AUTHORIZATION=f'Token {token.key}'
+    ))
+    reset_token_cache()
+
+    results = []
+    for requests in sizes or DEFAULT_SIZES:
+        result = {'requests': requests}
+        for name, backend in (
+            ('token', TokenAuthentication()),
+            ('cached', CachedTokenAuthentication()),
+        ):
+            def authenticate():
+                for _ in range(requests):
+                    backend.authenticate(request)
+
+            # Count the queries of a warm request
+            backend.authenticate(request)
+            with CaptureQueriesContext(connection) as context:
+                backend.authenticate(request)
+            result[f'{name}_queries'] = len(context)
+            result[f'{name}_us'] = measure(authenticate, repeat) * 1000 / \
+                requests
+        stdout.write(
+            f'{requests:>8} requests  '
+            f'token {result["token_us"]:8.1f} us/request '
+            f'({result["token_queries"]} queries)  '
+            f'cached {result["cached_us"]:8.1f} us/request '
+            f'({result["cached_queries"]} queries)'
+        )
+        results.append(result)
+
+    return results
@@ -0,0 +1,75 @@
+"""Compare issuing tokens with each password hasher, on a single core
+
+Hashing holds the core for the whole request, so the tokens issued per
+second of one thread are the capacity of each core of the server.
+Argon2 hashes with as many threads as its parallelism, set it to 1 to
+compare it on a single core.
+"""
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from benchmarks.utils import measure
+
+
+DEFAULT_SIZES = (10, 50)
+PASSWORD = 'benchpass'
+# Hashers with the library they need, if any
+HASHERS = (
+    ('md5', 'django.contrib.auth.hashers.MD5PasswordHasher', None),
+    ('pbkdf2', 'core.hashers.PBKDF2PasswordHasher', None),
+    ('bcrypt', 'core.hashers.BCryptSHA256PasswordHasher', 'bcrypt'),
+    ('argon2', 'core.hashers.Argon2PasswordHasher', 'argon2'),
+)
+
+
+def run(stdout, sizes=None, repeat=5):
+    """Time issuing the given number of tokens with every hasher"""
+    client = APIClient()
+    url = reverse('user:token')
+    results = []
+    # Every token is issued from this host, the IP bucket would answer
+    # most requests with 429 instead of hashing the password
+    throttle = dict(settings.TOKEN_THROTTLE, ENABLED=False)
+    for requests in sizes or DEFAULT_SIZES:
+        result = {'requests': requests}
+        line = f'{requests:>8} tokens'
+        for name, hasher, library in HASHERS:
+            if library and not find_spec(library):
+                line += f'  {name} (not installed)'
+                continue
+            with override_settings(
+                PASSWORD_HASHERS=[hasher],
+                TOKEN_THROTTLE=throttle
+            ):
+                user = get_user_model().objects.create_user(
+                    f'{name}{requests}@email.com',
+                    PASSWORD
+                )
+                payload = {'email': user.email, 'password': PASSWORD}
+
+                def issue():
+                    for _ in range(requests):
+                        client.post(url, payload)
+
+                ms = measure(issue, repeat) / requests
+            result[f'{name}_ms'] = ms
+            result[f'{name}_per_second'] = 1000 / ms
+            line += f'  {name} {ms:8.2f} ms ({1000 / ms:7.1f}/s)'
+        stdout.write(line)
+        results.append(result)
+
+    stdout.write(
+        f'Costs: PBKDF2 {settings.PASSWORD_HASHING["PBKDF2_ITERATIONS"]} '
+        f'iterations, bcrypt {settings.PASSWORD_HASHING["BCRYPT_ROUNDS"]} '
+        f'rounds, Argon2 time {settings.PASSWORD_HASHING["ARGON2_TIME_COST"]}'
+        f' memory {settings.PASSWORD_HASHING["ARGON2_MEMORY_COST"]} KiB '
+        f'parallelism {settings.PASSWORD_HASHING["ARGON2_PARALLELISM"]}'
+    )
+
+    return results
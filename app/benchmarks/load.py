@@ -0,0 +1,283 @@
+"""Drive the book and user APIs and measure each endpoint
+
+Requests go through the APIClient, in this thread, or through a real
+WSGI server answering several client threads at once.
+"""
+import http.client
+import json
+import queue
+import re
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.core.servers.basehttp import ThreadedWSGIServer, \
+    WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Author, Book
+
+from benchmarks.seed import PASSWORD, WORDS
+
+
+# Query count sent by core.middleware.RequestMetricsMiddleware
+QUERIES_RE = re.compile(r'queries;desc="(\d+)"')
+
+
+class Scenario:
+    """Request to an endpoint, made with the data of a user"""
+
+    def __init__(self, name, url_name, params=None, method='GET',
+                 detail=False, body=None, auth=True):
+        self.name = name
+        self.url_name = url_name
+        # Callables are given the data of the user
+        self.params = params or {}
+        self.method = method
+        self.detail = detail
+        self.body = body
+        self.auth = auth
+
+    def build(self, user, data):
+        """Return the path, body and headers of a request of the user"""
+        args = [data['book_id']] if self.detail else []
+        path = reverse(self.url_name, args=args)
+        params = {
+            key: value(data) if callable(value) else value
+            for key, value in self.params.items()
+        }
+        if params:
+            path = f'{path}?{urlencode(params)}'
+        body = self.body(user, data) if self.body else None
+        headers = {'Content-Type': 'application/json'} if body else {}
+        if self.auth:
+            headers['Authorization'] = f'Token {user.token.key}'
+
+        return path, body, headers
+
+
+def _new_book(user, data):
+    return {
+        'title': 'Load test book',
+        'pages': 100,
+        'year': 2000,
+        'price': '9.99',
+        'tags': [data['tag_id']],
+        'authors': [data['author_id']],
+    }
+
+
+def _credentials(user, data):
+    return {'email': user.email, 'password': PASSWORD}
+
+
+SCENARIOS = (
+    Scenario('tags', 'book:tag-list'),
+    Scenario('tags_assigned', 'book:tag-list', {'assigned_only': 1}),
+    Scenario('tags_autocomplete', 'book:tag-list',
+             {'prefix': lambda data: data['tag_prefix']}),
+    Scenario('authors', 'book:author-list'),
+    Scenario('books', 'book:book-list'),
+    Scenario('books_page', 'book:book-list', {'page_size': 50}),
+    Scenario('books_by_tag', 'book:book-list',
+             {'tags': lambda data: data['tag_id']}),
+    Scenario('books_search', 'book:book-list',
+             {'q': lambda data: data['word'], 'page_size': 50}),
+    Scenario('books_stats', 'book:book-stats', {'group_by': 'tag'}),
+    Scenario('book_detail', 'book:book-detail', detail=True),
+    Scenario('book_create', 'book:book-list', method='POST',
+             body=_new_book),
+    Scenario('user_me', 'user:me'),
+    Scenario('user_token', 'user:token', method='POST', body=_credentials,
+             auth=False),
+)
+
+
+def user_data(user):
+    """Return the ids and terms the scenarios of a user are made with"""
+    tag = Tag.objects.filter(user=user).order_by('-book_count').first()
+    return {
+        'tag_id': tag.id,
+        'tag_prefix': tag.name[:2],
+        'author_id': Author.objects.filter(user=user).first().id,
+        'book_id': Book.objects.filter(user=user).order_by('id').first().id,
+        'word': WORDS[user.id % len(WORDS)],
+    }
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of sorted values"""
+    if not values:
+        return 0
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+def summarize(samples, elapsed):
+    """Return the latency, query and throughput summary of samples
+        - samples: list of (latency in ms, queries, status code)
+        - elapsed: wall time taken by the samples, in seconds
+    """
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[1] for sample in samples if sample[1] is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[2] >= 400),
+        'p50_ms': percentile(latencies, 0.5),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': sum(latencies) / len(latencies) if latencies else 0,
+        'queries_per_request': sum(queries) / len(queries) if queries
+        else None,
+        'requests_per_second': len(samples) / elapsed if elapsed else 0,
+    }
+
+
+def prepare(users):
+    """Return the users paired with the data of their scenarios"""
+    return [(user, user_data(user)) for user in users]
+
+
+def _requests(scenario, users, requests):
+    """Return the requests of a scenario, spread over the users"""
+    return [
+        scenario.build(*users[i % len(users)])
+        for i in range(requests)
+    ]
+
+
+def run_client(users, requests, scenarios=SCENARIOS):
+    """Send the requests of every scenario through the APIClient
+        - users: users paired with their data, see prepare
+        - requests: number of requests of each scenario
+    """
+    client = APIClient()
+    results = {}
+    for scenario in scenarios:
+        samples = []
+        start = time.perf_counter()
+        for path, body, headers in _requests(scenario, users, requests):
+            extra = {
+                f'HTTP_{name.upper()}': value
+                for name, value in headers.items()
+                if name != 'Content-Type'
+            }
+            with CaptureQueriesContext(connection) as context:
+                request_start = time.perf_counter()
+                res = client.generic(
+                    scenario.method,
+                    path,
+                    json.dumps(body) if body else '',
+                    content_type=headers.get('Content-Type'),
+                    **extra
+                )
+                latency = (time.perf_counter() - request_start) * 1000
+            samples.append((latency, len(context), res.status_code))
+        results[scenario.name] = summarize(
+            samples,
+            time.perf_counter() - start
+        )
+
+    return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that does not log every request"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _send(host, port, jobs, samples):
+    """Send the requests of the queue until it is empty"""
+    while True:
+        try:
+            method, (path, body, headers) = jobs.get_nowait()
+        except queue.Empty:
+            return
+        # The development server closes the connection after each
+        # response, so every request opens its own
+        conn = http.client.HTTPConnection(host, port)
+        start = time.perf_counter()
+        conn.request(
+            method,
+            path,
+            json.dumps(body) if body else None,
+            headers
+        )
+        res = conn.getresponse()
+        res.read()
+        latency = (time.perf_counter() - start) * 1000
+        conn.close()
+        match = QUERIES_RE.search(res.getheader('Server-Timing', ''))
+        samples.append((
+            latency,
+            int(match.group(1)) if match else None,
+            res.status
+        ))
+
+
+def run_wsgi(users, requests, workers, scenarios=SCENARIOS):
+    """Send the requests of every scenario to a threaded WSGI server
+        - users: users paired with their data, see prepare
+        - requests: number of requests of each scenario
+        - workers: number of clients sending requests at the same time
+    """
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+    server.set_app(get_internal_wsgi_application())
+    host, port = server.server_address
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    # The server answers each request in a new thread, whose connection
+    # is never reused, so it is closed rather than left open
+    settings_dict = connection.settings_dict
+    max_age = settings_dict['CONN_MAX_AGE']
+    settings_dict['CONN_MAX_AGE'] = 0
+    results = {}
+    try:
+        with override_settings(ALLOWED_HOSTS=[host]):
+            for scenario in scenarios:
+                jobs = queue.Queue()
+                for request in _requests(scenario, users, requests):
+                    jobs.put((scenario.method, request))
+                samples = []
+                clients = [
+                    threading.Thread(
+                        target=_send,
+                        args=(host, port, jobs, samples)
+                    )
+                    for _ in range(workers)
+                ]
+                start = time.perf_counter()
+                for client in clients:
+                    client.start()
+                for client in clients:
+                    client.join()
+                results[scenario.name] = summarize(
+                    samples,
+                    time.perf_counter() - start
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+        settings_dict['CONN_MAX_AGE'] = max_age
+
+    return results
+
+
+def totals(results):
+    """Return the requests, errors and mean latency of all the scenarios"""
+    requests = sum(result['requests'] for result in results.values())
+    return {
+        'requests': requests,
+        'errors': sum(result['errors'] for result in results.values()),
+        'mean_ms': sum(
+            result['mean_ms'] * result['requests']
+            for result in results.values()
+        ) / requests if requests else 0,
+    }
@@ -0,0 +1,115 @@
+"""Seed users with libraries of books, tags and authors"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Tag, Author, Book
+
+from book import cache
+
+
+PASSWORD = 'benchpass'
+# Words the titles are made of, so searches match a share of the books
+WORDS = (
+    'night', 'house', 'garden', 'river', 'winter', 'shadow', 'city', 'road',
+    'secret', 'history', 'letters', 'island', 'war', 'silence', 'light',
+    'stone', 'memory', 'ocean', 'forest', 'kingdom', 'daughter', 'storm',
+    'mountain', 'journey', 'empire', 'glass', 'summer', 'fire', 'crown',
+    'desert', 'bridge', 'music', 'dream', 'machine', 'wolf', 'harbour',
+)
+
+
+def _zipf_weights(count):
+    """Return weights making a few objects far more popular than the rest"""
+    return [1 / rank for rank in range(1, count + 1)]
+
+
+def seed_library(users, books, tags=50, authors=30, tags_per_book=(1, 5),
+                 authors_per_book=(1, 2), seed=0):
+    """Create users owning books, return the users with a token each
+        - users: number of users
+        - books: number of books of each user
+        - tags, authors: number of tags and authors of each user
+        - tags_per_book, authors_per_book: range of links of a book
+    """
+    rand = random.Random(seed)
+    created = []
+    for index in range(users):
+        user = get_user_model().objects.create_user(
+            f'load{index}@email.com',
+            PASSWORD
+        )
+        user.token = Token.objects.create(user=user)
+        with transaction.atomic():
+            _seed_user(
+                rand, user, books, tags, authors, tags_per_book,
+                authors_per_book
+            )
+        # Bulk inserts do not send the signals that invalidate the cache
+        cache.invalidate_user(user.id)
+        created.append(user)
+
+    return created
+
+
+def _seed_user(rand, user, books, tags, authors, tags_per_book,
+               authors_per_book):
+    """Create the library of a user"""
+    tag_ids = [
+        tag.pk for tag in Tag.objects.bulk_create(
+            Tag(user=user, name=f'{rand.choice(WORDS).title()} {i}')
+            for i in range(tags)
+        )
+    ]
+    author_ids = [
+        author.pk for author in Author.objects.bulk_create(
+            Author(user=user, name=f'Author {rand.choice(WORDS)} {i}')
+            for i in range(authors)
+        )
+    ]
+    if any(pk is None for pk in tag_ids + author_ids):
+        # The database did not return the ids of the new rows
+        tag_ids = list(Tag.objects.filter(user=user).values_list(
+            'id',
+            flat=True
+        ))
+        author_ids = list(Author.objects.filter(user=user).values_list(
+            'id',
+            flat=True
+        ))
+    tag_weights = _zipf_weights(len(tag_ids))
+    author_weights = _zipf_weights(len(author_ids))
+
+    new_books = []
+    book_tags = []
+    book_authors = []
+    for i in range(books):
+        new_books.append(Book(
+            user=user,
+            title=' '.join(rand.choices(WORDS, k=rand.randint(2, 5))).title(),
+            pages=rand.randint(50, 1200),
+            year=rand.randint(1800, 2020),
+            price=Decimal(rand.randint(100, 9999)) / 100,
+        ))
+        # Duplicates drawn from the weights are removed
+        book_tags.append(list(set(rand.choices(
+            tag_ids,
+            tag_weights,
+            k=rand.randint(*tags_per_book)
+        ))))
+        book_authors.append(list(set(rand.choices(
+            author_ids,
+            author_weights,
+            k=rand.randint(*authors_per_book)
+        ))))
+
+    Book.objects.bulk_create_with_relations(
+        new_books,
+        book_tags,
+        book_authors,
+        batch_size=1000
+    )
@@ -0,0 +1,59 @@
+import datetime
+import json
+import platform
+import time
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment
+)
+
+
+@contextmanager
+def benchmark_database():
+    """Run the block against a throwaway test database"""
+    # Benchmarks seed large amounts of rows, never do it on the real db
+    old_config = setup_databases(verbosity=0, interactive=False)
+    # Accept the requests of the test client, without paying for the
+    # query log kept in debug mode
+    setup_test_environment(debug=False)
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+        teardown_databases(old_config, verbosity=0)
+
+
+def measure(func, repeat=5):
+    """Return the best wall time of running func, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return min(timings)
+
+
+def sample_user(email='bench@email.com'):
+    """Create and return a user to own the benchmark data"""
+    return get_user_model().objects.create_user(email, 'benchpass')
+
+
+def write_results(path, name, config, results):
+    """Write the results of a run as JSON, to compare runs over time"""
+    report = {
+        'benchmark': name,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'config': config,
+        'results': results,
+    }
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
@@ -0,0 +1,90 @@
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Hit and miss counters of this process
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def enabled():
+    """Return whether the book API caches responses and sends ETags"""
+    # The versions must be seen by every process, a write handled by one
+    # of them would otherwise leave the others serving the old responses
+    return settings.BOOK_CACHE_ALIAS is not None
+
+
+def _cache():
+    """Return the cache backend configured for the book API"""
+    return caches[settings.BOOK_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    """Return the cache key holding the version of a user's data"""
+    return f'book:version:{user_id}'
+
+
+def get_version(user_id):
+    """Return the current version of a user's data, None when the cache
+    is off"""
+    if not enabled():
+        return None
+    key = _version_key(user_id)
+    version = _cache().get(key)
+    if version is None:
+        # add() keeps the version another process may have just set
+        _cache().add(key, uuid.uuid4().hex, None)
+        version = _cache().get(key)
+
+    return version
+
+
+def invalidate_user(user_id):
+    """Invalidate every cached response of a user"""
+    if not enabled():
+        return
+    # A new random version makes the old keys unreachable, they are
+    # left to expire instead of being tracked and deleted one by one
+    _cache().set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def list_key(user_id, endpoint, params):
+    """Return the cache key for a list request"""
+    query = '&'.join(
+        f'{name}={value}'
+        for name in sorted(params)
+        for value in params.getlist(name)
+    )
+    digest = hashlib.md5(query.encode()).hexdigest()
+
+    return f'book:list:{user_id}:{get_version(user_id)}:{endpoint}:{digest}'
+
+
+def get_list(key):
+    """Return the cached list payload for the key or None"""
+    data = _cache().get(key)
+    with _stats_lock:
+        _stats['misses' if data is None else 'hits'] += 1
+
+    return data
+
+
+def set_list(key, data):
+    """Store a list payload under the key"""
+    _cache().set(key, data, settings.BOOK_CACHE_TIMEOUT)
+
+
+def get_stats():
+    """Return the hit and miss counters of this process"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    """Set the hit and miss counters back to zero"""
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
@@ -0,0 +1,74 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Book
+
+
+# Columns of every exported book
+FIELDS = ('id', 'title', 'pages', 'year', 'price', 'link', 'tags', 'authors')
+# Content type of each export format
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+# Separator of the tag and author names inside a CSV cell
+CSV_LIST_SEPARATOR = '|'
+
+
+def iter_books(queryset, chunk_size):
+    """Yield the books of the queryset as dictionaries, chunk by chunk"""
+    # Read the books through a server-side cursor where available
+    rows = queryset.values(*FIELDS[:-2]).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        # Two queries per chunk fetch the names of its relations
+        ids = [row['id'] for row in chunk]
+        tags, authors = (
+            # In the order the links were made
+            Book.objects.related_values(
+                field,
+                'name',
+                ordering=('id',),
+                id__in=ids
+            )
+            for field in (Book.tags.field, Book.authors.field)
+        )
+        for row in chunk:
+            row['tags'] = tags[row['id']]
+            row['authors'] = authors[row['id']]
+            yield row
+
+
+def iter_ndjson(books):
+    """Yield each book as a line of JSON"""
+    for book in books:
+        yield json.dumps(book, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo:
+    """File-like object returning what is written instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(books):
+    """Yield a CSV header and a CSV line for each book"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for book in books:
+        book['tags'] = CSV_LIST_SEPARATOR.join(book['tags'])
+        book['authors'] = CSV_LIST_SEPARATOR.join(book['authors'])
+        yield writer.writerow([book[field] for field in FIELDS])
+
+
+def stream(queryset, export_format, chunk_size):
+    """Return an iterator over the export of the queryset"""
+    writers = {'ndjson': iter_ndjson, 'csv': iter_csv}
+    return writers[export_format](iter_books(queryset, chunk_size))
@@ -0,0 +1,122 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Avg, Count, Exists, F, OuterRef, Sum
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import Book
+
+
+# Numeric fields of a book that can be filtered on a range
+RANGE_FIELDS = ('year', 'pages', 'price')
+RANGE_LOOKUPS = ('gt', 'gte', 'lt', 'lte')
+
+# Fields the books can be sorted on, '-' in front to reverse them
+ORDERING_FIELDS = ('id', 'title', 'year', 'pages', 'price')
+DEFAULT_ORDERING = ('-id',)
+
+# How books are matched against a list of tags or authors
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+# Relation of a book each group of the statistics is made from
+GROUPS = {'year': None, 'tag': 'tags', 'author': 'authors'}
+
+
+def filter_ranges(queryset, params):
+    """Filter the books on the range parameters, e.g. year__gte=1990"""
+    filters = {}
+    errors = {}
+    for name in RANGE_FIELDS:
+        field = Book._meta.get_field(name)
+        for lookup in RANGE_LOOKUPS:
+            param = f'{name}__{lookup}'
+            value = params.get(param)
+            if value is None:
+                continue
+            try:
+                # Parse the value the same way the model field does
+                filters[param] = field.to_python(value)
+            except DjangoValidationError as error:
+                errors[param] = error.messages
+
+    if errors:
+        raise ValidationError(errors)
+
+    return queryset.filter(**filters)
+
+
+def get_match(params):
+    """Return whether books need any or all of the tags and authors"""
+    match = params.get('match', MATCH_ANY)
+    if match not in MATCH_MODES:
+        modes = ', '.join(MATCH_MODES)
+        raise ValidationError({'match': f'Expected one of {modes}'})
+
+    return match
+
+
+def filter_related(queryset, field, ids, match=MATCH_ANY):
+    """Filter the books linked to any or all of the ids through field"""
+    ids = set(ids)
+    # Query the through table instead of joining it, so each book
+    # is returned once however many of the ids it is linked to
+    links = field.remote_field.through.objects.filter(
+        **{f'{field.m2m_reverse_field_name()}__in': ids}
+    )
+    book_name = field.m2m_field_name()
+    if match == MATCH_ALL:
+        # Keep the books with a link to every one of the ids
+        books = links.values(book_name).annotate(
+            links=Count(field.m2m_reverse_field_name())
+        ).filter(links=len(ids)).values(book_name)
+        return queryset.filter(pk__in=books)
+
+    return queryset.filter(Exists(links.filter(**{book_name: OuterRef('pk')})))
+
+
+def get_ordering(params):
+    """Return the ordering of the books asked in the parameters"""
+    ordering = params.get('ordering')
+    if not ordering:
+        return DEFAULT_ORDERING
+
+    if ordering.lstrip('-') not in ORDERING_FIELDS:
+        fields = ', '.join(ORDERING_FIELDS)
+        raise ValidationError({'ordering': f'Expected one of {fields}'})
+
+    if ordering.lstrip('-') == 'id':
+        return (ordering,)
+
+    # Books sharing a value keep a stable order for the pagination
+    return (ordering, '-id' if ordering.startswith('-') else 'id')
+
+
+def get_stats(queryset, group_by):
+    """Return the count, sums and averages of the books in each group"""
+    if group_by not in GROUPS:
+        groups = ', '.join(GROUPS)
+        raise ValidationError({'group_by': f'Expected one of {groups}'})
+
+    # Select the filtered books once, so joins made by the filters
+    # cannot repeat a book inside a group
+    books = Book.objects.filter(pk__in=queryset.order_by().values('pk'))
+    relation = GROUPS[group_by]
+    if relation:
+        # Leave out the books without any tag or author
+        books = books.filter(**{f'{relation}__isnull': False}).values(**{
+            group_by: F(f'{relation}__id'),
+            'name': F(f'{relation}__name'),
+        })
+        ordering = ('name', group_by)
+    else:
+        books = books.values(group_by)
+        ordering = (group_by,)
+
+    return books.annotate(
+        count=Count('id'),
+        pages_total=Sum('pages'),
+        pages_average=Avg('pages'),
+        price_total=Sum('price'),
+        price_average=Avg('price'),
+    ).order_by(*ordering)
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Book
+
+from book import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class SynchronousQueue:
+    """Run the jobs straight away in the current thread"""
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+class ThreadPoolQueue:
+    """Run the jobs in a pool of threads of the current process"""
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_executor(cls):
+        """Return the pool shared by the process, creating it once"""
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=settings.BOOK_IMAGE_WORKERS,
+                    thread_name_prefix='book-images'
+                )
+
+        return cls._executor
+
+    def submit(self, func, *args):
+        self._get_executor().submit(self._run, func, *args)
+
+    @staticmethod
+    def _run(func, *args):
+        """Run a job and release the database connections of the thread"""
+        try:
+            func(*args)
+        finally:
+            connections.close_all()
+
+
+def get_queue():
+    """Return the queue configured to process the images"""
+    return import_string(settings.BOOK_IMAGE_QUEUE)()
+
+
+def thumbnail_name(name, width, height):
+    """Return the storage name of a thumbnail of the image"""
+    root, ext = os.path.splitext(name)
+    return f'{root}_{width}x{height}{ext}'
+
+
+def delete_thumbnails(names):
+    """Delete thumbnails no book refers to anymore"""
+    storage = Book._meta.get_field('image').storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception('Could not delete the thumbnail %s', name)
+
+
+def process_image(book_id, previous_thumbnails=(), image_name=None):
+    """Create the thumbnails of the image of a book, then delete the
+    thumbnails of its previous image
+        - image_name: image the job was scheduled for, the job of a
+          newer image makes the thumbnails when it was replaced
+    """
+    book = Book.objects.filter(pk=book_id).first()
+    if book is None or not book.image or (
+        image_name is not None and book.image.name != image_name
+    ):
+        delete_thumbnails(previous_thumbnails)
+        return
+
+    storage = book.image.storage
+    thumbnails = {}
+    try:
+        with storage.open(book.image.name) as file:
+            original = Image.open(file)
+            original.load()
+        image_format = original.format or 'JPEG'
+        if image_format == 'JPEG' and original.mode not in ('RGB', 'L'):
+            original = original.convert('RGB')
+
+        for width, height in settings.BOOK_IMAGE_THUMBNAIL_SIZES:
+            image = original.copy()
+            # Keeps the aspect ratio, the image fits in the size
+            image.thumbnail((width, height))
+            buffer = BytesIO()
+            image.save(buffer, format=image_format)
+            thumbnails[f'{width}x{height}'] = storage.save(
+                thumbnail_name(book.image.name, width, height),
+                ContentFile(buffer.getvalue())
+            )
+        image_status = Book.IMAGE_DONE
+    except Exception:
+        logger.exception('Could not process the image of book %s', book_id)
+        image_status = Book.IMAGE_FAILED
+
+    updated = Book.objects.filter(pk=book_id, image=book.image.name).update(
+        image_status=image_status,
+        image_thumbnails=thumbnails,
+        updated_at=timezone.now()
+    )
+    if updated:
+        # update() does not send the signals, invalidate the cache here
+        cache.invalidate_user(book.user_id)
+    else:
+        # The image was replaced or the book deleted meanwhile, nothing
+        # refers to the thumbnails just saved
+        delete_thumbnails(thumbnails.values())
+    # The upload of the image emptied the thumbnails of the book, the
+    # jobs of later uploads don't know the old ones, they go either way
+    delete_thumbnails(previous_thumbnails)
+
+
+def schedule_processing(book, previous_thumbnails=()):
+    """Queue the processing of the image once it is committed
+        - previous_thumbnails: storage names of the thumbnails of the
+          image replaced, deleted once the new ones are saved
+    """
+    previous_thumbnails = list(previous_thumbnails)
+    transaction.on_commit(
+        lambda: get_queue().submit(
+            process_image,
+            book.pk,
+            previous_thumbnails,
+            book.image.name
+        )
+    )
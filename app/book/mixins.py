@@ -0,0 +1,155 @@
+import calendar
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from book import cache
+
+
+class CachedListMixin:
+    """Serve the list action from the per-user response cache"""
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached payload or build and cache it"""
+        if not cache.enabled():
+            return super().list(request, *args, **kwargs)
+        key = cache.list_key(
+            request.user.id,
+            self.basename,
+            request.query_params
+        )
+        data = cache.get_list(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set_list(key, response.data)
+
+        return response
+
+
+class ColumnarListMixin:
+    """Send the list as one array per field when the client asks"""
+    layouts = ('rows', 'columnar')
+
+    def list(self, request, *args, **kwargs):
+        """Turn the rows of the list into columns"""
+        layout = request.query_params.get('layout', 'rows')
+        if layout not in self.layouts:
+            layouts = ', '.join(self.layouts)
+            raise ValidationError({'layout': f'Expected one of {layouts}'})
+
+        response = super().list(request, *args, **kwargs)
+        if layout == 'columnar' and response.status_code == status.HTTP_200_OK:
+            if isinstance(response.data, list):
+                response.data = self._to_columns(response.data)
+            else:
+                # Paginated, the links stay around the results
+                response.data['results'] = self._to_columns(
+                    response.data['results']
+                )
+
+        return response
+
+    def _to_columns(self, rows):
+        """Return a list of rows as a dictionary of columns"""
+        # The names come from the serializer so an empty list has them
+        names = list(self.get_serializer().fields)
+        columns = {name: [] for name in names}
+        for row in rows:
+            for name in names:
+                columns[name].append(row[name])
+
+        return columns
+
+
+class RowListMixin:
+    """Serialize the list from plain rows when the view has a serializer"""
+
+    def get_row_serializer(self):
+        """Return the serializer of the rows, None to use the default"""
+        return None
+
+    def list(self, request, *args, **kwargs):
+        """Return the list serialized from rows of values"""
+        serializer = self.get_row_serializer()
+        if serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = serializer.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+
+        return Response(serializer.to_representation(rows))
+
+
+class ConditionalListMixin:
+    """Answer conditional GET requests of the list without building it"""
+
+    def _get_etag(self, request):
+        """Return the ETag of the response to the request, None when the
+        cache of the versions is off"""
+        if not cache.enabled():
+            return None
+        # Every write of the user changes the version, so the tag
+        # is computed without reading the data it describes
+        version = cache.get_version(request.user.id)
+        path = request.get_full_path()
+        digest = hashlib.md5(f'{version}:{path}'.encode()).hexdigest()
+
+        return f'"{digest}"'
+
+    def _finalize_conditional(self, response, etag):
+        """Add the validators to a response"""
+        if etag is not None and response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = etag
+        # The representation depends on the authenticated user
+        patch_vary_headers(response, ('Authorization',))
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Return 304 if the client's copy of the list is current"""
+        etag = self._get_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+
+        return self._finalize_conditional(response, etag)
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    """Answer conditional GET requests of the list and of the objects"""
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return 304 if the client's copy of the object is current"""
+        etag = self._get_etag(request)
+        # Check the ETag before touching the database
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            instance = self.get_object()
+            last_modified = calendar.timegm(
+                instance.updated_at.utctimetuple()
+            )
+            response = get_conditional_response(
+                request,
+                last_modified=last_modified
+            )
+            if response is None:
+                serializer = self.get_serializer(instance)
+                response = Response(serializer.data)
+            response['Last-Modified'] = http_date(last_modified)
+
+        return self._finalize_conditional(response, etag)
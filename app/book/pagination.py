@@ -0,0 +1,38 @@
+from django.conf import settings
+
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """Keyset pagination applied only when the client asks for it"""
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        # Read the sizes on every request so they can be overridden
+        self.page_size = settings.BOOK_PAGE_SIZE
+        self.max_page_size = settings.BOOK_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate only if the request sends a cursor or a page size"""
+        params = request.query_params
+        if self.cursor_query_param not in params and \
+                self.page_size_query_param not in params:
+            # Keep returning the plain list to existing clients
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+class BookCursorPagination(OptInCursorPagination):
+    """Paginate books on their id, newest first"""
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        """Follow the ordering of the view, the client's or the rank of
+        the books found by a search"""
+        return view.get_ordering()
+
+
+class BookAttrCursorPagination(OptInCursorPagination):
+    """Paginate tags and authors on their name"""
+    ordering = '-name'
@@ -0,0 +1,149 @@
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Length
+
+from core.models import Book
+
+from book import cache
+
+
+# Weight of each part of a book, the defaults of Postgres' ranking
+WEIGHTS = {'title': 1.0, 'authors': 0.4, 'tags': 0.2}
+WORD_RE = re.compile(r'\w+')
+# Ordering of the books found, on the rank annotated by search_books
+RANK_ORDERING = ('-rank', '-id')
+
+
+def tokenize(text):
+    """Return the lowercase words of the text"""
+    return WORD_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """In-process full-text index of books, used without Postgres"""
+
+    def __init__(self):
+        # Word -> {book id: score}
+        self._postings = defaultdict(lambda: defaultdict(float))
+
+    def add(self, book_id, title, authors, tags):
+        """Index the words of a book"""
+        for part, text in (
+            ('title', title),
+            ('authors', ' '.join(authors)),
+            ('tags', ' '.join(tags)),
+        ):
+            for word in tokenize(text):
+                self._postings[word][book_id] += WEIGHTS[part]
+
+    def search(self, text):
+        """Return (book id, rank) of books with every word, best first"""
+        words = tokenize(text)
+        if not words:
+            return []
+
+        postings = [self._postings.get(word, {}) for word in words]
+        # Like plainto_tsquery every word must be present
+        book_ids = set.intersection(*(set(posting) for posting in postings))
+        ranks = {
+            book_id: sum(posting[book_id] for posting in postings)
+            for book_id in book_ids
+        }
+
+        return sorted(ranks.items(), key=lambda item: (-item[1], -item[0]))
+
+
+# Index of each user, kept until the user's data version changes
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(user):
+    """Return the inverted index of the books of a user"""
+    version = cache.get_version(user.id)
+    with _indexes_lock:
+        entry = _indexes.get(user.id)
+    # Without a version the index can't be known to be current
+    if version is not None and entry is not None and entry[0] == version:
+        return entry[1]
+
+    index = InvertedIndex()
+    authors, tags = (
+        Book.objects.related_values(field, 'name', user=user)
+        for field in (Book.authors.field, Book.tags.field)
+    )
+    for book_id, title in Book.objects.filter(user=user).values_list(
+        'id',
+        'title'
+    ):
+        index.add(book_id, title, authors[book_id], tags[book_id])
+
+    if version is not None:
+        with _indexes_lock:
+            _indexes[user.id] = (version, index)
+
+    return index
+
+
+def search_books(queryset, text, user):
+    """Return the books of the queryset matching the text, best first"""
+    if connections[queryset.db].vendor == 'postgresql':
+        query = SearchQuery(text, config=settings.BOOK_SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            # ts_rank returns a real, the cursor pagination compares the
+            # rank it read back to the column, both must be doubles
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        ).order_by(*RANK_ORDERING)
+
+    ranks = get_index(user).search(text)
+    return queryset.filter(pk__in=[book_id for book_id, _ in ranks]).annotate(
+        rank=Case(
+            *(When(pk=book_id, then=Value(rank)) for book_id, rank in ranks),
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    ).order_by(*RANK_ORDERING)
+
+
+# Database alias -> whether the pg_trgm extension is installed
+_trigram_support = {}
+
+
+def has_trigram(alias):
+    """Return whether trigram similarity can be used on the database"""
+    if alias not in _trigram_support:
+        connection = connections[alias]
+        supported = False
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+                )
+                supported = cursor.fetchone() is not None
+        _trigram_support[alias] = supported
+
+    return _trigram_support[alias]
+
+
+def autocomplete(queryset, text, mode, limit):
+    """Return the first objects whose name starts with or contains text"""
+    lookup = 'istartswith' if mode == 'prefix' else 'icontains'
+    # Both lookups compare UPPER(name) with LIKE on Postgres, answered by
+    # the trigram indexes on that expression
+    queryset = queryset.filter(**{f'name__{lookup}': text})
+    if has_trigram(queryset.db):
+        queryset = queryset.annotate(
+            relevance=TrigramSimilarity('name', text)
+        ).order_by('-relevance', 'name')
+    else:
+        # The closest names are the ones adding the fewest characters
+        queryset = queryset.order_by(Length('name'), 'name')
+
+    return queryset[:limit]
@@ -1,27 +1,54 @@
+
 from rest_framework import serializers
 
 from core.models import Tag, Author, Book
 
 
-class TagSerializer(serializers.ModelSerializer):
+class ThumbnailsField(serializers.ReadOnlyField):
+    """Serialize the stored thumbnails of a book as URLs"""
+
+    def to_representation(self, value):
+        storage = Book._meta.get_field('image').storage
+        request = self.context.get('request')
+        urls = {}
+        for size, name in value.items():
+            url = storage.url(name)
+            # Return absolute URLs as the image field does
+            urls[size] = request.build_absolute_uri(url) if request else url
+
+        return urls
+
+
+class DynamicFieldsMixin:
+    """Let the view choose a subset of the fields to serialize"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            # Keep the declared order, whatever the order asked
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TagSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for tag objects"""
 
     class Meta:
         model = Tag
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'book_count')
+        read_only_fields = ('id', 'book_count')
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for author objects"""
 
     class Meta:
         model = Author
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'book_count')
+        read_only_fields = ('id', 'book_count')
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serialize a book"""
     authors = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -43,16 +70,102 @@ class BookSerializer(serializers.ModelSerializer):
 
 class BookDetailSerializer(BookSerializer):
     """Serialize a book detail"""
-    # Serialize the author attribute with the Author serializer
-    authors = AuthorSerializer(many=True, read_only=True)
+    # Serialize the author attribute with the Author serializer, the
+    # counts change with other books so they are left out of the detail
+    authors = AuthorSerializer(
+        many=True,
+        read_only=True,
+        fields=('id', 'name')
+    )
     # Serialize the tag attribute with the Tag serializer
-    tags = TagSerializer(many=True, read_only=True)
+    tags = TagSerializer(many=True, read_only=True, fields=('id', 'name'))
+    thumbnails = ThumbnailsField(source='image_thumbnails')
+
+    class Meta(BookSerializer.Meta):
+        fields = BookSerializer.Meta.fields + (
+            'image', 'image_status', 'thumbnails'
+        )
+        read_only_fields = ('id', 'image', 'image_status')
+
+
+class BookBulkSerializer(BookSerializer):
+    """Serialize a book of a bulk request"""
+    # The ids are checked for all the books at once by the view
+    authors = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list
+    )
+
+
+class BookBulkUpdateSerializer(BookBulkSerializer):
+    """Serialize a book of a bulk update, found by its id"""
+    id = serializers.IntegerField()
 
 
 class BookImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to books"""
+    thumbnails = ThumbnailsField(source='image_thumbnails')
 
     class Meta:
         model = Book
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'thumbnails')
+        read_only_fields = ('id', 'image_status')
+
+
+class BookRowSerializer:
+    """Serialize books as BookSerializer does, from plain rows"""
+    # Fields read from the through tables instead of the book rows
+    relations = {'tags': Book.tags.field, 'authors': Book.authors.field}
+
+    def __init__(self, fields=None, ordering=()):
+        # Same order as BookSerializer, so the output is the same
+        self.fields = [
+            name for name in BookSerializer.Meta.fields
+            if fields is None or name in fields
+        ]
+        # The pagination reads the values the books are ordered by
+        self.columns = {'id'}
+        self.columns.update(name.lstrip('-') for name in ordering)
+        self.columns.update(
+            name for name in self.fields if name not in self.relations
+        )
+
+    def get_rows(self, queryset):
+        """Return the queryset as rows of the columns to serialize"""
+        # The relations are read in bulk by to_representation
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def to_representation(self, rows):
+        """Return the books of the rows as dictionaries"""
+        rows = list(rows)
+        ids = [row['id'] for row in rows]
+        related = {
+            name: Book.objects.related_values(
+                field,
+                'id',
+                # The order of the ids in BookSerializer
+                ordering=(field.m2m_reverse_name(),),
+                id__in=ids
+            )
+            for name, field in self.relations.items()
+            if name in self.fields
+        }
+
+        books = []
+        for row in rows:
+            book = {}
+            for name in self.fields:
+                if name in related:
+                    book[name] = related[name].get(row['id'], [])
+                elif name == 'price':
+                    # The database returns it with its decimal places
+                    book[name] = '{:f}'.format(row[name])
+                else:
+                    book[name] = row[name]
+            books.append(book)
+
+        return books
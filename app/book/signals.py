@@ -0,0 +1,176 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, \
+    pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Author, Book
+
+from book import cache
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_owner(sender, instance, **kwargs):
+    """Invalidate the cached lists of the user owning the object"""
+    cache.invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Book.tags.through)
+@receiver(m2m_changed, sender=Book.authors.through)
+def invalidate_owner_relations(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Invalidate the cached lists when a book's relations change"""
+    if not action.startswith('post_'):
+        return
+
+    # The instance is the book, or the tag or author on reverse changes
+    cache.invalidate_user(instance.user_id)
+    # Mark the books as modified, their detail shows the relations
+    if not reverse:
+        book_ids = [instance.pk]
+    elif pk_set:
+        book_ids = pk_set
+    else:
+        return
+    Book.objects.filter(pk__in=book_ids).update(updated_at=timezone.now())
+    Book.objects.update_search_vectors(book_ids)
+
+
+# Relation of books each through table stores the links of
+BOOK_RELATIONS = {
+    Book.tags.through: Book.tags.field,
+    Book.authors.through: Book.authors.field,
+}
+
+
+@receiver(m2m_changed, sender=Book.tags.through)
+@receiver(m2m_changed, sender=Book.authors.through)
+def update_book_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep the book counts of the tags and authors up to date"""
+    field = BOOK_RELATIONS[sender]
+    book_name = field.m2m_field_name()
+    related_name = field.m2m_reverse_field_name()
+    if action in ('pre_remove', 'pre_clear'):
+        # The ids to remove may not be linked, count the links that
+        # are actually deleted before they are gone
+        if reverse:
+            links = sender.objects.filter(**{related_name: instance.pk})
+            other_name = book_name
+        else:
+            links = sender.objects.filter(**{book_name: instance.pk})
+            other_name = related_name
+        if pk_set is not None:
+            links = links.filter(**{f'{other_name}__in': pk_set})
+        instance._removed_links = list(
+            links.values_list(f'{other_name}_id', flat=True)
+        )
+        return
+    elif action == 'post_add':
+        linked = pk_set
+        delta = 1
+    elif action in ('post_remove', 'post_clear'):
+        linked = instance.__dict__.pop('_removed_links', ())
+        delta = -1
+    else:
+        return
+
+    if reverse:
+        # The instance is the tag or author, linked to several books
+        deltas = {instance.pk: delta * len(linked)}
+    else:
+        deltas = dict.fromkeys(linked, delta)
+    field.related_model.objects.add_book_counts(deltas)
+
+
+# Owners of the books being deleted in this thread, by database
+_deleting = threading.local()
+
+
+def _deleting_owners(using):
+    if not hasattr(_deleting, 'owners'):
+        _deleting.owners = defaultdict(set)
+
+    return _deleting.owners[using]
+
+
+@receiver(pre_delete, sender=Book)
+def remember_book_owner(sender, instance, using, **kwargs):
+    """Keep the owner of a deleted book to recount its tags and authors"""
+    _deleting_owners(using).add(instance.user_id)
+
+
+@receiver(post_delete, sender=Book)
+def recount_owner_books(sender, instance, using, **kwargs):
+    """Recount the tags and authors of the owners of the deleted books
+
+    The links are deleted with the books, without m2m_changed. Every
+    pre_delete of a deletion is sent before its first post_delete, which
+    recounts for all the books deleted together, one statement per model.
+    """
+    owners = _deleting_owners(using)
+    if not owners:
+        return
+    user_ids = list(owners)
+    owners.clear()
+    # Counts only go down, those already at zero are left out
+    for field in BOOK_RELATIONS.values():
+        field.related_model.objects.using(using).filter(
+            user_id__in=user_ids,
+            book_count__gt=0
+        ).recount_books()
+
+
+@receiver(post_save, sender=Book)
+def update_book_search_vector(sender, instance, **kwargs):
+    """Index the new title of a saved book"""
+    Book.objects.update_search_vectors([instance.pk])
+
+
+def touch_related_books(book_ids):
+    """Mark the books showing a changed tag or author as modified and
+    index its new name"""
+    Book.objects.filter(pk__in=book_ids).update(updated_at=timezone.now())
+    Book.objects.update_search_vectors(book_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Author)
+def update_related_books(sender, instance, created, **kwargs):
+    """Update the books of a renamed tag or author"""
+    if not created:
+        touch_related_books(
+            list(instance.book_set.values_list('id', flat=True))
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Author)
+def remember_related_books(sender, instance, **kwargs):
+    """Keep the books of a tag or author before its links are deleted"""
+    instance.deleted_book_ids = list(
+        instance.book_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Author)
+def remove_from_related_books(sender, instance, **kwargs):
+    """Update the books of a deleted tag or author"""
+    touch_related_books(getattr(instance, 'deleted_book_ids', ()))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_new_user(sender, instance, created, **kwargs):
+    """Start new users from a fresh version of the cache"""
+    # Ids can be reused (e.g. after a rollback), never serve a new
+    # user what was cached for a previous owner of the id
+    if created:
+        cache.invalidate_user(instance.id)
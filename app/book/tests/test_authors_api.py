@@ -119,6 +119,8 @@ class PrivateAuthorsApiTests(TestCase):
         )
         # Add autho to book
         book.authors.add(author1)
+        # Read the book count the link has updated
+        author1.refresh_from_db()
 
         # Make HTTP request to get authors assigned to at
         # least a book
@@ -160,3 +162,17 @@ class PrivateAuthorsApiTests(TestCase):
 
         # Check that only one author is returned
         self.assertEqual(len(res.data), 1)
+
+    def test_autocomplete_prefix(self):
+        """Test suggesting the authors starting with a prefix"""
+        Author.objects.create(user=self.user, name='Virginia Woolf')
+        Author.objects.create(user=self.user, name='Vladimir Nabokov')
+        Author.objects.create(user=self.user, name='Ursula K. Le Guin')
+
+        res = self.client.get(AUTHOR_URL, {'prefix': 'vi'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [author['name'] for author in res.data],
+            ['Virginia Woolf']
+        )
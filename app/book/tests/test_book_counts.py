@@ -0,0 +1,182 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Author, Book
+
+
+TAGS_URL = reverse('book:tag-list')
+BULK_URL = reverse('book:book-bulk')
+
+
+class BookCountTests(TestCase):
+    """Test the book counts of the tags and authors are maintained"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.tag1 = Tag.objects.create(user=self.user, name='Horror')
+        self.tag2 = Tag.objects.create(user=self.user, name='Gothic')
+        self.author = Author.objects.create(user=self.user, name='Poe')
+        self.book1 = self._sample_book('The Raven')
+        self.book2 = self._sample_book('The Black Cat')
+
+    def _sample_book(self, title):
+        """Create and return a book of the user"""
+        return Book.objects.create(
+            user=self.user,
+            title=title,
+            pages=100,
+            year=1845,
+            price=5.00
+        )
+
+    def assertBookCounts(self, model, expected):
+        """Assert the stored book counts match the actual links"""
+        counts = dict(model.objects.values_list('name', 'book_count'))
+        self.assertEqual(counts, expected)
+
+    def test_add_links(self):
+        """Test adding books to tags, twice the same link included"""
+        self.book1.tags.add(self.tag1, self.tag2)
+        self.book2.tags.add(self.tag1)
+        self.book2.tags.add(self.tag1)
+
+        self.assertBookCounts(Tag, {'Horror': 2, 'Gothic': 1})
+
+    def test_add_reverse_links(self):
+        """Test adding books from the side of the author"""
+        self.author.book_set.add(self.book1, self.book2)
+
+        self.assertBookCounts(Author, {'Poe': 2})
+
+    def test_remove_links(self):
+        """Test removing links, some of which do not exist"""
+        self.book1.tags.add(self.tag1)
+        self.book2.tags.add(self.tag1)
+
+        self.book1.tags.remove(self.tag1, self.tag2)
+        self.tag1.book_set.remove(self.book2, self._sample_book('Eldorado'))
+
+        self.assertBookCounts(Tag, {'Horror': 0, 'Gothic': 0})
+
+    def test_clear_links(self):
+        """Test clearing the links from both sides"""
+        self.book1.tags.add(self.tag1, self.tag2)
+        self.book2.tags.add(self.tag2)
+
+        self.book1.tags.clear()
+        self.assertBookCounts(Tag, {'Horror': 0, 'Gothic': 1})
+        self.tag2.book_set.clear()
+        self.assertBookCounts(Tag, {'Horror': 0, 'Gothic': 0})
+
+    def test_set_links(self):
+        """Test replacing the links of a book"""
+        self.book1.tags.set([self.tag1])
+
+        self.book1.tags.set([self.tag2])
+
+        self.assertBookCounts(Tag, {'Horror': 0, 'Gothic': 1})
+
+    def test_delete_book(self):
+        """Test that deleting a book takes it out of the counts"""
+        self.book1.tags.add(self.tag1)
+        self.book1.authors.add(self.author)
+        self.book2.tags.add(self.tag1)
+
+        self.book1.delete()
+
+        self.assertBookCounts(Tag, {'Horror': 1, 'Gothic': 0})
+        self.assertBookCounts(Author, {'Poe': 0})
+
+    def test_delete_books_together(self):
+        """Test deleting a queryset of books updates the counts at once"""
+        self.book1.tags.add(self.tag1, self.tag2)
+        self.book2.tags.add(self.tag1)
+        self.book2.authors.add(self.author)
+        self._sample_book('Eldorado').tags.add(self.tag1)
+
+        with CaptureQueriesContext(connection) as context:
+            Book.objects.filter(pk__in=[self.book1.pk, self.book2.pk]).delete()
+
+        self.assertBookCounts(Tag, {'Horror': 1, 'Gothic': 0})
+        self.assertBookCounts(Author, {'Poe': 0})
+        updates = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 2)
+
+    def test_delete_user_constant_queries(self):
+        """Test the queries deleting a user do not grow with its books"""
+        def delete_user(email, books):
+            user = get_user_model().objects.create_user(email, 'testpass')
+            tag = Tag.objects.create(user=user, name='Tag')
+            for i in range(books):
+                Book.objects.create(
+                    user=user,
+                    title=f'Book {i}',
+                    pages=100,
+                    year=2000,
+                    price=1
+                ).tags.add(tag)
+            with CaptureQueriesContext(connection) as context:
+                user.delete()
+
+            return len(context)
+
+        self.assertEqual(
+            delete_user('few@email.com', 2),
+            delete_user('many@email.com', 10)
+        )
+
+    def test_delete_with_drifted_counts(self):
+        """Test deleting books never takes a count below zero"""
+        self.book1.tags.add(self.tag1)
+        self.book1.authors.add(self.author)
+        Tag.objects.update(book_count=0)
+
+        self.book1.delete()
+        self.book2.tags.add(self.tag2)
+        Tag.objects.update(book_count=0)
+        self.book2.tags.remove(self.tag2)
+
+        self.assertBookCounts(Tag, {'Horror': 0, 'Gothic': 0})
+        self.assertBookCounts(Author, {'Poe': 0})
+
+    def test_bulk_create_counts(self):
+        """Test that the bulk endpoint updates the counts"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.post(BULK_URL, [
+            {'title': 'Ligeia', 'pages': 20, 'year': 1838, 'price': '1.00',
+             'tags': [self.tag1.id, self.tag2.id],
+             'authors': [self.author.id]},
+            {'title': 'Berenice', 'pages': 20, 'year': 1835, 'price': '1.00',
+             'tags': [self.tag1.id]},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertBookCounts(Tag, {'Horror': 2, 'Gothic': 1})
+        self.assertBookCounts(Author, {'Poe': 1})
+
+    def test_tags_api_shows_counts(self):
+        """Test that the tag list sends the stored counts"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.book1.tags.add(self.tag1)
+
+        res = client.get(TAGS_URL)
+
+        self.assertEqual(
+            {tag['name']: tag['book_count'] for tag in res.data},
+            {'Horror': 1, 'Gothic': 0}
+        )
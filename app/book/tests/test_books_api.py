@@ -1,10 +1,15 @@
+import csv
+import json
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -12,10 +17,14 @@ from rest_framework.test import APIClient
 
 from core.models import Book, Tag, Author
 
+from book import images
 from book.serializers import BookSerializer, BookDetailSerializer
 
 
 BOOKS_URL = reverse('book:book-list')
+BULK_URL = reverse('book:book-bulk')
+EXPORT_URL = reverse('book:book-export')
+STATS_URL = reverse('book:book-stats')
 
 
 def image_upload_url(book_id):
@@ -324,6 +333,567 @@ class PrivateBookApiTests(TestCase):
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
 
+    def test_filter_books_any_tag_no_duplicates(self):
+        """Test that a book with several of the tags is returned once"""
+        book = sample_book(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Physics')
+        tag2 = sample_tag(user=self.user, name='Comedy')
+        book.tags.add(tag1, tag2)
+
+        res = self.client.get(
+            BOOKS_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'match': 'any'}
+        )
+
+        self.assertEqual([item['id'] for item in res.data], [book.id])
+
+    def test_filter_books_all_tags(self):
+        """Test returning the books having every one of the tags"""
+        book1 = sample_book(user=self.user, title='Relativity')
+        book2 = sample_book(user=self.user, title='Cosmos')
+        tag1 = sample_tag(user=self.user, name='Physics')
+        tag2 = sample_tag(user=self.user, name='Classic')
+        book1.tags.add(tag1, tag2)
+        book2.tags.add(tag1)
+        author = sample_author(user=self.user)
+        book1.authors.add(author)
+        book2.authors.add(author)
+
+        res = self.client.get(BOOKS_URL, {
+            'tags': f'{tag1.id},{tag2.id},{tag2.id}',
+            'authors': author.id,
+            'match': 'all',
+        })
+
+        self.assertEqual([item['id'] for item in res.data], [book1.id])
+
+    def test_filter_books_invalid_match(self):
+        """Test that the match mode must be any or all"""
+        res = self.client.get(BOOKS_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _count_queries(self, url):
+        """Return the number of queries run by a GET request to url"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return len(context)
+
+    def _sample_books_with_relations(self, count):
+        """Create books linked to a tag and an author each"""
+        for i in range(count):
+            book = sample_book(user=self.user, title=f'Book {i}')
+            book.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            book.authors.add(sample_author(user=self.user, name=f'Author {i}'))
+
+    def test_list_books_constant_queries(self):
+        """Test listing books runs the same queries for any book count"""
+        self._sample_books_with_relations(2)
+        few = self._count_queries(BOOKS_URL)
+
+        self._sample_books_with_relations(10)
+        many = self._count_queries(BOOKS_URL)
+
+        # Check that the tags and authors are fetched in bulk
+        self.assertEqual(few, many)
+
+    def test_view_book_detail_constant_queries(self):
+        """Test viewing a book runs the same queries for any relation count"""
+        book = sample_book(user=self.user)
+        book.tags.add(sample_tag(user=self.user))
+        book.authors.add(sample_author(user=self.user))
+        few = self._count_queries(detail_url(book.id))
+
+        for i in range(10):
+            book.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            book.authors.add(sample_author(user=self.user, name=f'Author {i}'))
+        many = self._count_queries(detail_url(book.id))
+
+        self.assertEqual(few, many)
+
+
+class BookFilterApiTests(TestCase):
+    """Test the range filters, ordering and statistics of books"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.book1 = sample_book(self.user, title='A', year=1950,
+                                 pages=100, price=10.00)
+        self.book2 = sample_book(self.user, title='B', year=1990,
+                                 pages=300, price=5.00)
+        self.book3 = sample_book(self.user, title='C', year=1990,
+                                 pages=200, price=20.00)
+
+    def test_filter_books_by_ranges(self):
+        """Test filtering books on the ranges of their fields"""
+        res = self.client.get(
+            BOOKS_URL,
+            {'year__gte': 1980, 'price__lt': '20.00'}
+        )
+
+        self.assertEqual([book['id'] for book in res.data], [self.book2.id])
+
+    def test_filter_books_invalid_range(self):
+        """Test that a range value must be valid for its field"""
+        res = self.client.get(BOOKS_URL, {'pages__lte': 'many'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pages__lte', res.data)
+
+    def test_order_books(self):
+        """Test sorting the books on a field"""
+        res = self.client.get(BOOKS_URL, {'ordering': '-price'})
+
+        self.assertEqual(
+            [book['id'] for book in res.data],
+            [self.book3.id, self.book1.id, self.book2.id]
+        )
+
+    def test_order_books_invalid_field(self):
+        """Test that books can only be sorted on known fields"""
+        res = self.client.get(BOOKS_URL, {'ordering': 'user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paginate_ordered_books(self):
+        """Test that the pagination follows the asked ordering"""
+        res = self.client.get(BOOKS_URL, {'ordering': 'pages', 'page_size': 2})
+        ids = [book['id'] for book in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [book['id'] for book in res.data['results']]
+
+        self.assertEqual(ids, [self.book1.id, self.book3.id, self.book2.id])
+
+    def test_stats_by_year(self):
+        """Test the statistics of the books of each year"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(STATS_URL, {'group_by': 'year'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        stats = [
+            (row['year'], row['count'], row['pages_total'])
+            for row in res.data
+        ]
+        self.assertEqual(stats, [(1950, 1, 100), (1990, 2, 500)])
+        self.assertEqual(float(res.data[1]['price_average']), 12.5)
+        book_queries = [q for q in context if 'core_book' in q['sql']]
+        self.assertEqual(len(book_queries), 1)
+
+    def test_stats_by_tag(self):
+        """Test the statistics of the books of each tag, with filters"""
+        tag1 = sample_tag(self.user, name='Classic')
+        tag2 = sample_tag(self.user, name='Drama')
+        self.book1.tags.add(tag1, tag2)
+        self.book2.tags.add(tag2)
+        self.book3.tags.add(tag2)
+
+        res = self.client.get(
+            STATS_URL,
+            {'group_by': 'tag', 'tags': f'{tag1.id},{tag2.id}',
+             'pages__gte': 200}
+        )
+
+        self.assertEqual(
+            [(row['tag'], row['name'], row['count']) for row in res.data],
+            [(tag2.id, 'Drama', 2)]
+        )
+        self.assertEqual(res.data[0]['pages_total'], 500)
+
+    def test_stats_invalid_group(self):
+        """Test that the statistics need a known group"""
+        res = self.client.get(STATS_URL, {'group_by': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookSparseFieldsApiTests(TestCase):
+    """Test choosing the fields and layout of the book responses"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.book = sample_book(user=self.user, title='Ulysses')
+        self.book.tags.add(sample_tag(user=self.user))
+
+    def test_list_sparse_fields(self):
+        """Test that only the asked fields and columns are read"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(BOOKS_URL, {'fields': 'title,id'})
+
+        self.assertEqual(res.data, [{'id': self.book.id, 'title': 'Ulysses'}])
+        book_queries = [q['sql'] for q in context if 'core_book' in q['sql']]
+        # Check the relations were not prefetched
+        self.assertEqual(len(book_queries), 1)
+        self.assertNotIn('"core_book"."price"', book_queries[0])
+
+    def test_list_sparse_fields_with_relation(self):
+        """Test that an asked relation is still prefetched"""
+        res = self.client.get(BOOKS_URL, {'fields': 'id,tags'})
+
+        self.assertEqual(
+            res.data,
+            [{'id': self.book.id, 'tags': [self.book.tags.get().id]}]
+        )
+
+    def test_detail_sparse_fields(self):
+        """Test choosing the fields of a book detail"""
+        res = self.client.get(detail_url(self.book.id), {'fields': 'image'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'image': None})
+        self.assertIn('Last-Modified', res)
+
+    def test_unknown_fields(self):
+        """Test that only fields of the serializer can be asked"""
+        res = self.client.get(BOOKS_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_columnar_layout(self):
+        """Test sending the list as one array per field"""
+        book2 = sample_book(user=self.user, title='Dubliners')
+
+        res = self.client.get(
+            BOOKS_URL,
+            {'fields': 'id,title', 'layout': 'columnar'}
+        )
+
+        self.assertEqual(res.data, {
+            'id': [book2.id, self.book.id],
+            'title': ['Dubliners', 'Ulysses'],
+        })
+
+    def test_columnar_layout_paginated(self):
+        """Test that a paginated list has columnar results"""
+        res = self.client.get(
+            BOOKS_URL,
+            {'fields': 'id', 'layout': 'columnar', 'page_size': 1}
+        )
+
+        self.assertEqual(res.data['results'], {'id': [self.book.id]})
+        self.assertIn('next', res.data)
+
+    def test_invalid_layout(self):
+        """Test that the layout must be a known one"""
+        res = self.client.get(BOOKS_URL, {'layout': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookBulkApiTests(TestCase):
+    """Test creating and updating books in bulk"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_books(self):
+        """Test creating several books with their relations"""
+        tag = sample_tag(user=self.user)
+        author = sample_author(user=self.user)
+        payload = [
+            {
+                'title': 'Zalacain el aventurero',
+                'pages': 200,
+                'year': 1909,
+                'price': '8.00',
+                'tags': [tag.id],
+                'authors': [author.id]
+            },
+            {
+                'title': 'El arbol de la ciencia',
+                'pages': 300,
+                'year': 1911,
+                'price': '9.50',
+                'tags': [tag.id, tag.id]
+            },
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        books = Book.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [book.title for book in books],
+            [item['title'] for item in payload]
+        )
+        self.assertEqual(list(books[0].authors.all()), [author])
+        self.assertEqual(list(books[1].tags.all()), [tag])
+        self.assertEqual(
+            res.data,
+            BookSerializer(books, many=True).data
+        )
+
+    def test_bulk_create_constant_queries(self):
+        """Test the queries do not grow with the number of books"""
+        tag = sample_tag(user=self.user)
+
+        def payload(count):
+            return [
+                {
+                    'title': f'Book {i}',
+                    'pages': 100,
+                    'year': 2000,
+                    'price': '1.00',
+                    'tags': [tag.id]
+                }
+                for i in range(count)
+            ]
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(BULK_URL, payload(2), format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.post(BULK_URL, payload(20), format='json')
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.assertEqual(len(few), len(many))
+
+    def test_bulk_create_invalid_items(self):
+        """Test that errors are reported per book and nothing is created"""
+        other = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        other_tag = sample_tag(user=other)
+        payload = [
+            {'title': 'Valid', 'pages': 100, 'year': 2000, 'price': '1.00'},
+            {
+                'title': 'Foreign tag',
+                'pages': 100,
+                'year': 2000,
+                'price': '1.00',
+                'tags': [other_tag.id]
+            },
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertFalse(Book.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_invalid_fields(self):
+        """Test that field validation errors are reported per book"""
+        payload = [
+            {'title': 'No pages', 'year': 2000, 'price': '1.00'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pages', res.data[0])
+
+    def test_bulk_create_requires_list(self):
+        """Test that the payload must be a list"""
+        res = self.client.post(BULK_URL, {'title': 'Alone'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BOOK_BULK_MAX_SIZE=2)
+    def test_bulk_create_too_many_books(self):
+        """Test that a list over the maximum size is rejected"""
+        payload = [
+            {'title': f'Book {i}', 'pages': 100, 'year': 2000,
+             'price': '1.00'}
+            for i in range(3)
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Book.objects.filter(user=self.user).exists())
+
+    def test_bulk_update_books(self):
+        """Test updating several books and replacing their relations"""
+        tag = sample_tag(user=self.user)
+        other_tag = sample_tag(user=self.user, name='Drama')
+        author = sample_author(user=self.user)
+        first = sample_book(user=self.user, link='https://books.com/1')
+        first.tags.add(tag)
+        first.authors.add(author)
+        second = sample_book(user=self.user)
+        payload = [
+            {
+                'id': second.id,
+                'title': 'Second',
+                'pages': 20,
+                'year': 2002,
+                'price': '2.00',
+                'tags': [tag.id, other_tag.id]
+            },
+            {
+                'id': first.id,
+                'title': 'First',
+                'pages': 10,
+                'year': 2001,
+                'price': '1.00',
+                'tags': [other_tag.id]
+            },
+        ]
+
+        res = self.client.put(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.title, first.pages), ('First', 10))
+        # Fields left out keep their value, as in a single update
+        self.assertEqual(first.link, 'https://books.com/1')
+        self.assertEqual(list(first.tags.all()), [other_tag])
+        self.assertFalse(first.authors.exists())
+        self.assertEqual(second.title, 'Second')
+        self.assertEqual(second.tags.count(), 2)
+        tag.refresh_from_db()
+        other_tag.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual(
+            (tag.book_count, other_tag.book_count, author.book_count),
+            (1, 2, 0)
+        )
+        books = Book.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(res.data, BookSerializer(books, many=True).data)
+
+    def test_bulk_update_constant_queries(self):
+        """Test the update queries do not grow with the number of books"""
+        tag = sample_tag(user=self.user)
+        books = [sample_book(user=self.user) for _ in range(20)]
+
+        def payload(count):
+            return [
+                {
+                    'id': book.id,
+                    'title': f'Book {book.id}',
+                    'pages': 100,
+                    'year': 2000,
+                    'price': '1.00',
+                    'tags': [tag.id]
+                }
+                for book in books[:count]
+            ]
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.put(BULK_URL, payload(2), format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.put(BULK_URL, payload(20), format='json')
+
+        self.assertEqual(len(few), len(many))
+
+    def test_bulk_update_unknown_books(self):
+        """Test that unknown, foreign and repeated books are reported"""
+        other = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        book = sample_book(user=self.user)
+        other_book = sample_book(user=other)
+        item = {'title': 'New', 'pages': 100, 'year': 2000, 'price': '1.00'}
+        payload = [
+            dict(item, id=book.id),
+            dict(item, id=other_book.id),
+            dict(item, id=book.id),
+        ]
+
+        res = self.client.put(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        self.assertIn('id', res.data[2])
+        book.refresh_from_db()
+        self.assertEqual(book.title, 'Sample book')
+
+    def test_bulk_update_requires_ids(self):
+        """Test that the books to update must have an id"""
+        payload = [
+            {'title': 'New', 'pages': 100, 'year': 2000, 'price': '1.00'},
+        ]
+
+        res = self.client.put(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+
+
+@override_settings(BOOK_EXPORT_CHUNK_SIZE=2)
+class BookExportApiTests(TestCase):
+    """Test exporting the library of a user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        # More books than fit in a chunk
+        self.books = [
+            sample_book(user=self.user, title=f'Book {i}') for i in range(5)
+        ]
+        self.books[0].tags.add(sample_tag(user=self.user, name='Essay'))
+        self.books[0].authors.add(sample_author(user=self.user))
+
+    def test_export_ndjson(self):
+        """Test exporting the books as one JSON document per line"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        books = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [book['id'] for book in books],
+            [book.id for book in reversed(self.books)]
+        )
+        self.assertEqual(books[-1]['tags'], ['Essay'])
+        self.assertEqual(books[-1]['authors'], ['Pio Baroja'])
+        self.assertEqual(books[-1]['price'], '5.00')
+
+    def test_export_csv(self):
+        """Test exporting the books as CSV"""
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(content.splitlines()))
+        self.assertEqual(len(rows), len(self.books))
+        self.assertEqual(rows[-1]['title'], self.books[0].title)
+        self.assertEqual(rows[-1]['tags'], 'Essay')
+
+    def test_export_limited_to_user(self):
+        """Test that only the books of the user are exported"""
+        other = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        sample_book(user=other)
+
+        res = self.client.get(EXPORT_URL)
+
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(self.books))
+
+    def test_export_invalid_type(self):
+        """Test that an unknown export type is rejected"""
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class BookImageUploadTests(TestCase):
 
@@ -339,9 +909,25 @@ class BookImageUploadTests(TestCase):
         self.book = sample_book(user=self.user)
 
     def tearDown(self):
-        # Remove image after test
+        # Remove image and its thumbnails after test
+        self.book.refresh_from_db()
+        for name in self.book.image_thumbnails.values():
+            self.book.image.storage.delete(name)
         self.book.image.delete()
 
+    def _upload_sample_image(self):
+        """Upload a 10x10 image to the book and return the response"""
+        url = image_upload_url(self.book.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (10, 10))
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            # Run the processing queued on commit of the request
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        return res
+
     def test_upload_image_to_book(self):
         """Test uploading an email to book"""
         # Get url for book id
@@ -373,3 +959,132 @@ class BookImageUploadTests(TestCase):
 
         # Check that the request fails
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('book.images.get_queue')
+    def test_upload_image_returns_before_processing(self, mock_get_queue):
+        """Test the upload responds with the image pending processing"""
+        res = self._upload_sample_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], Book.IMAGE_PENDING)
+        self.assertEqual(res.data['thumbnails'], {})
+        # Check that the processing was handed off to the queue
+        mock_get_queue.return_value.submit.assert_called_once()
+
+    @override_settings(
+        BOOK_IMAGE_QUEUE='book.images.SynchronousQueue',
+        BOOK_IMAGE_THUMBNAIL_SIZES=[(4, 4), (8, 8)]
+    )
+    def test_upload_image_creates_thumbnails(self):
+        """Test that processing the image creates every thumbnail"""
+        self._upload_sample_image()
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.image_status, Book.IMAGE_DONE)
+        self.assertEqual(set(self.book.image_thumbnails), {'4x4', '8x8'})
+        name = self.book.image_thumbnails['4x4']
+        with self.book.image.storage.open(name) as file:
+            self.assertEqual(Image.open(file).size, (4, 4))
+
+    @override_settings(
+        BOOK_IMAGE_QUEUE='book.images.SynchronousQueue',
+        BOOK_IMAGE_THUMBNAIL_SIZES=[(4, 4), (8, 8)]
+    )
+    def test_upload_image_deletes_previous_thumbnails(self):
+        """Test that a new image replaces the thumbnails of the old one"""
+        self._upload_sample_image()
+        self.book.refresh_from_db()
+        storage = self.book.image.storage
+        previous_image = self.book.image.name
+        self.addCleanup(storage.delete, previous_image)
+        previous = list(self.book.image_thumbnails.values())
+
+        self._upload_sample_image()
+
+        self.book.refresh_from_db()
+        self.assertEqual(set(self.book.image_thumbnails), {'4x4', '8x8'})
+        for name in previous:
+            self.assertFalse(storage.exists(name))
+        for name in self.book.image_thumbnails.values():
+            self.assertTrue(storage.exists(name))
+
+    @override_settings(BOOK_IMAGE_THUMBNAIL_SIZES=[(4, 4)])
+    def test_image_replaced_before_processing(self):
+        """Test only the newest image of a book gets thumbnails when the
+        jobs run late"""
+        with override_settings(
+            BOOK_IMAGE_QUEUE='book.images.SynchronousQueue'
+        ):
+            self._upload_sample_image()
+        self.book.refresh_from_db()
+        storage = self.book.image.storage
+        self.addCleanup(storage.delete, self.book.image.name)
+        previous = list(self.book.image_thumbnails.values())
+        with patch('book.images.get_queue') as mock_get_queue:
+            self._upload_sample_image()
+            self.book.refresh_from_db()
+            replaced = self.book.image.name
+            self.addCleanup(storage.delete, replaced)
+            self._upload_sample_image()
+        first, second = (
+            call.args
+            for call in mock_get_queue.return_value.submit.call_args_list
+        )
+
+        with patch.object(
+            images,
+            'thumbnail_name',
+            wraps=images.thumbnail_name
+        ) as mock_thumbnail_name:
+            images.process_image(*first[1:])
+            images.process_image(*second[1:])
+
+        # Made once, by the job of the newest image
+        mock_thumbnail_name.assert_called_once()
+        self.book.refresh_from_db()
+        for name in previous:
+            self.assertFalse(storage.exists(name))
+        self.assertEqual(set(self.book.image_thumbnails), {'4x4'})
+
+    @override_settings(BOOK_IMAGE_THUMBNAIL_SIZES=[(4, 4)])
+    def test_image_replaced_while_processing(self):
+        """Test the thumbnails of an image replaced before they are saved
+        are deleted"""
+        with patch('book.images.get_queue') as mock_get_queue:
+            self._upload_sample_image()
+        job = mock_get_queue.return_value.submit.call_args.args
+        self.book.refresh_from_db()
+        storage = self.book.image.storage
+        replaced = self.book.image.name
+        self.addCleanup(storage.delete, replaced)
+
+        thumbnail_name = images.thumbnail_name
+
+        def replace_image(*args):
+            # Another upload while the thumbnails are made
+            Book.objects.filter(pk=self.book.pk).update(image='other.jpg')
+            return thumbnail_name(*args)
+
+        with patch.object(images, 'thumbnail_name', replace_image):
+            job[0](*job[1:])
+
+        self.assertFalse(
+            storage.exists(images.thumbnail_name(replaced, 4, 4))
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.image_thumbnails, {})
+        # Not a file of the storage, left out of the clean up
+        self.book.image = None
+
+    @override_settings(
+        BOOK_IMAGE_QUEUE='book.images.SynchronousQueue',
+        BOOK_IMAGE_THUMBNAIL_SIZES=[(4, 4)]
+    )
+    def test_book_detail_shows_thumbnails(self):
+        """Test that the book detail exposes the thumbnail URLs"""
+        self._upload_sample_image()
+
+        res = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(res.data['image_status'], Book.IMAGE_DONE)
+        self.assertTrue(res.data['thumbnails']['4x4'].startswith('http'))
@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.checks import run_checks
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Author, Book
+
+from book import cache
+
+
+TAGS_URL = reverse('book:tag-list')
+AUTHORS_URL = reverse('book:author-list')
+BOOKS_URL = reverse('book:book-list')
+
+
+class ListCacheTests(TestCase):
+    """Test the per-user cache of the list endpoints"""
+
+    def setUp(self):
+        caches[settings.BOOK_CACHE_ALIAS].clear()
+        cache.reset_stats()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_hits_cache(self):
+        """Test that listing twice serves the second response from cache"""
+        Tag.objects.create(user=self.user, name='Horror')
+
+        res1 = self.client.get(TAGS_URL)
+        res2 = self.client.get(TAGS_URL)
+
+        self.assertEqual(res2.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.data, res2.data)
+        self.assertEqual(cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_query_params_cached_separately(self):
+        """Test that different query parameters are different entries"""
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(cache.get_stats(), {'hits': 0, 'misses': 2})
+
+    def test_cache_limited_to_user(self):
+        """Test that a user is never served another user's list"""
+        Author.objects.create(user=self.user, name='Sally Rooney')
+        self.client.get(AUTHORS_URL)
+        user2 = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(AUTHORS_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_create_invalidates(self):
+        """Test that creating an object invalidates the cached list"""
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Comedy'})
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(cache.get_stats(), {'hits': 0, 'misses': 2})
+
+    def test_delete_invalidates(self):
+        """Test that deleting a book invalidates the cached list"""
+        book = Book.objects.create(
+            user=self.user,
+            title='Dune',
+            pages=600,
+            year=1965,
+            price=9.00
+        )
+        self.client.get(BOOKS_URL)
+        book.delete()
+
+        res = self.client.get(BOOKS_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_relation_change_invalidates(self):
+        """Test that adding a tag to a book invalidates the cached lists"""
+        tag = Tag.objects.create(user=self.user, name='Horror')
+        book = Book.objects.create(
+            user=self.user,
+            title='It',
+            pages=1000,
+            year=1986,
+            price=9.00
+        )
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+        book.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data), 1)
+
+    @override_settings(BOOK_CACHE_ALIAS=None)
+    def test_cache_off(self):
+        """Test that nothing is cached without a shared cache"""
+        self.client.get(TAGS_URL)
+        Tag.objects.filter(user=self.user).delete()
+        Tag.objects.bulk_create([Tag(user=self.user, name='Horror')])
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(cache.get_stats(), {'hits': 0, 'misses': 0})
+
+    def test_local_cache_deploy_warning(self):
+        """Test the deploy checks warn about a cache local to a process"""
+        def ids():
+            return [
+                message.id
+                for message in run_checks(include_deployment_checks=True)
+            ]
+
+        self.assertIn('core.W002', ids())
+        with self.settings(BOOK_CACHE_ALIAS=None):
+            self.assertNotIn('core.W002', ids())
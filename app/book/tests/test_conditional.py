@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Book
+
+
+TAGS_URL = reverse('book:tag-list')
+BOOKS_URL = reverse('book:book-list')
+
+
+def detail_url(book_id):
+    """Return book detail URL"""
+    return reverse('book:book-detail', args=[book_id])
+
+
+class ConditionalGetTests(TestCase):
+    """Test the ETag and Last-Modified support of the book API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.book = Book.objects.create(
+            user=self.user,
+            title='Dracula',
+            pages=400,
+            year=1897,
+            price=6.00
+        )
+
+    def test_list_etag_not_modified(self):
+        """Test that a matching ETag returns 304 without any query"""
+        res = self.client.get(BOOKS_URL)
+        etag = res['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(BOOKS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(len(context), 0)
+
+    @override_settings(BOOK_CACHE_ALIAS=None)
+    def test_no_etag_without_cache(self):
+        """Test that no ETag is sent when the versions are not shared"""
+        res = self.client.get(BOOKS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
+
+    def test_etag_changes_after_write(self):
+        """Test that a write makes the previous ETag stale"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        Tag.objects.create(user=self.user, name='Gothic')
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data), 1)
+
+    def test_etag_depends_on_query(self):
+        """Test that different query parameters have different ETags"""
+        res1 = self.client.get(TAGS_URL)
+        res2 = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertNotEqual(res1['ETag'], res2['ETag'])
+
+    def test_detail_etag_not_modified(self):
+        """Test that a matching ETag on a book detail returns 304"""
+        res = self.client.get(detail_url(self.book.id))
+
+        res = self.client.get(
+            detail_url(self.book.id),
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_last_modified(self):
+        """Test the book detail honours If-Modified-Since"""
+        res = self.client.get(detail_url(self.book.id))
+        self.assertEqual(
+            res['Last-Modified'],
+            http_date(self.book.updated_at.timestamp())
+        )
+
+        res = self.client.get(
+            detail_url(self.book.id),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_relation_change_updates_book(self):
+        """Test that adding a tag marks the book as modified"""
+        updated_at = self.book.updated_at
+
+        self.book.tags.add(Tag.objects.create(user=self.user, name='Gothic'))
+
+        self.book.refresh_from_db()
+        self.assertGreater(self.book.updated_at, updated_at)
+
+    def test_rename_tag_updates_book(self):
+        """Test that renaming a tag of a book marks the book as modified"""
+        tag = Tag.objects.create(user=self.user, name='Old')
+        self.book.tags.add(tag)
+        # Last-Modified has a precision of a second
+        Book.objects.filter(pk=self.book.pk).update(
+            updated_at=self.book.updated_at - timedelta(seconds=10)
+        )
+        last_modified = self.client.get(
+            detail_url(self.book.id)
+        )['Last-Modified']
+
+        tag.name = 'New'
+        tag.save()
+        res = self.client.get(
+            detail_url(self.book.id),
+            HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'New')
+
+    def test_detail_not_found(self):
+        """Test that a missing book still returns 404"""
+        res = self.client.get(detail_url(self.book.id + 1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
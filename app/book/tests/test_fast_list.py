@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Author, Book
+
+
+BOOKS_URL = reverse('book:book-list')
+
+
+class FastListTests(TestCase):
+    """Test the book list built from rows matches the serializer"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        author = Author.objects.create(user=self.user, name='Jane Austen')
+        for i in range(5):
+            book = Book.objects.create(
+                user=self.user,
+                title=f'Book {i}',
+                pages=100 + i,
+                year=1800 + i,
+                price=i * 2.5,
+                link='' if i % 2 else f'https://books.com/{i}'
+            )
+            # Link the tags in reverse so their order is not the insertion
+            book.tags.add(*reversed(tags[:i]))
+            if i % 2:
+                book.authors.add(author)
+
+    def assertSameContent(self, params):
+        """Assert that both list paths send the same bytes"""
+        responses = []
+        for fast_list in (False, True):
+            caches[settings.BOOK_CACHE_ALIAS].clear()
+            with override_settings(BOOK_FAST_LIST=fast_list):
+                res = self.client.get(BOOKS_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            responses.append(res.content)
+
+        self.assertEqual(responses[0], responses[1])
+
+    def test_list_same_content(self):
+        """Test the full list"""
+        self.assertSameContent({})
+
+    def test_sparse_fields_same_content(self):
+        """Test a list of some of the fields"""
+        self.assertSameContent({'fields': 'title,tags,price'})
+
+    def test_paginated_same_content(self):
+        """Test a page ordered on another field"""
+        self.assertSameContent({'ordering': '-price', 'page_size': 2})
+
+    def test_filtered_same_content(self):
+        """Test a list filtered on the relations and ranges"""
+        tag = Tag.objects.get(name='Tag 0')
+        self.assertSameContent({'tags': tag.id, 'year__gte': 1802})
+
+    def test_search_same_content(self):
+        """Test a list of search results"""
+        self.assertSameContent({'q': 'book'})
+
+    def test_columnar_same_content(self):
+        """Test a list in the columnar layout"""
+        self.assertSameContent({'layout': 'columnar'})
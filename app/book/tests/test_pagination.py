@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, Tag
+
+
+BOOKS_URL = reverse('book:book-list')
+TAGS_URL = reverse('book:tag-list')
+
+
+def sample_book(user, title='Sample book'):
+    """Create and return a sample book"""
+    return Book.objects.create(
+        user=user,
+        title=title,
+        pages=100,
+        year=1990,
+        price=5.00
+    )
+
+
+class CursorPaginationTests(TestCase):
+    """Test the opt-in cursor pagination of the book API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_books_not_paginated_by_default(self):
+        """Test that the book list is a plain list without parameters"""
+        sample_book(user=self.user)
+
+        res = self.client.get(BOOKS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_paginate_books(self):
+        """Test walking through every page of books"""
+        books = [sample_book(self.user, f'Book {i}') for i in range(5)]
+
+        ids = []
+        res = self.client.get(BOOKS_URL, {'page_size': 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [book['id'] for book in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        # Check that every book was returned once, newest first
+        self.assertEqual(ids, [book.id for book in reversed(books)])
+
+    def test_deep_page_uses_keyset(self):
+        """Test that following a cursor filters on the key, not an offset"""
+        for i in range(4):
+            sample_book(self.user, f'Book {i}')
+        res = self.client.get(BOOKS_URL, {'page_size': 2})
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(res.data['next'])
+
+        book_queries = [
+            query['sql'] for query in context
+            if 'FROM "core_book"' in query['sql']
+        ]
+        self.assertNotIn('OFFSET', book_queries[0])
+
+    @override_settings(BOOK_MAX_PAGE_SIZE=3)
+    def test_page_size_capped(self):
+        """Test that the page size cannot exceed the server maximum"""
+        for i in range(5):
+            sample_book(self.user, f'Book {i}')
+
+        res = self.client.get(BOOKS_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_paginate_tags_by_name(self):
+        """Test paginating tags following their name ordering"""
+        for name in ('Art', 'Crime', 'Drama', 'Poetry'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 3})
+        names = [tag['name'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [tag['name'] for tag in res.data['results']]
+
+        self.assertEqual(names, ['Poetry', 'Drama', 'Crime', 'Art'])
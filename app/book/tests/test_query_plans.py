@@ -0,0 +1,134 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Tag, Author, Book
+
+from book import filters, search
+
+
+# Rows fetched by a paginated list request
+PAGE = 51
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN checks need Postgres')
+class QueryPlanTests(TestCase):
+    """Test that the book API queries are answered from an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Seed several users so filtering on one is selective
+        users = [
+            get_user_model().objects.create_user(f'user{i}@email.com', 'pass')
+            for i in range(10)
+        ]
+        cls.user = users[0]
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}')
+            for user in users for i in range(300)
+        )
+        Author.objects.bulk_create(
+            Author(user=user, name=f'Author {i}')
+            for user in users for i in range(300)
+        )
+        Book.objects.bulk_create(
+            Book(user=user, title=f'Book {i}', pages=100, year=2000, price=1)
+            for user in users for i in range(300)
+        )
+        cls.book = Book.objects.filter(user=cls.user).first()
+        cls.tag = Tag.objects.filter(user=cls.user).first()
+        cls.author = Author.objects.filter(user=cls.user).first()
+        cls.book.tags.add(cls.tag)
+        cls.book.authors.add(cls.author)
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            # The seeded tables are small enough to be read sequentially,
+            # only fall back to that when no index can answer the query
+            cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index):
+        """Assert that the plan of the queryset scans the given index"""
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_tags_by_user_ordered_by_name(self):
+        """Test listing tags uses the user and name index"""
+        queryset = Tag.objects.filter(user=self.user).order_by('-name')
+
+        self.assertUsesIndex(queryset[:PAGE], 'tag_user_name_idx')
+
+    def test_authors_by_user_ordered_by_name(self):
+        """Test listing authors uses the user and name index"""
+        queryset = Author.objects.filter(user=self.user).order_by('-name')
+
+        self.assertUsesIndex(queryset[:PAGE], 'author_user_name_idx')
+
+    def test_books_by_user_ordered_by_id(self):
+        """Test listing books uses the user and id index"""
+        queryset = Book.objects.filter(user=self.user).order_by('-id')
+
+        self.assertUsesIndex(queryset[:PAGE], 'book_user_id_idx')
+
+    def test_books_by_tag(self):
+        """Test filtering books by tag uses the reverse through index"""
+        queryset = filters.filter_related(
+            Book.objects.filter(user=self.user),
+            Book.tags.field,
+            [self.tag.id]
+        )
+
+        self.assertUsesIndex(queryset, 'book_tags_tag_book_idx')
+
+    def test_books_by_author(self):
+        """Test filtering books by author uses the reverse through index"""
+        queryset = filters.filter_related(
+            Book.objects.filter(user=self.user),
+            Book.authors.field,
+            [self.author.id]
+        )
+
+        self.assertUsesIndex(queryset, 'book_authors_author_book_idx')
+
+    def test_books_matching_all_tags(self):
+        """Test matching every tag groups the reverse through index"""
+        queryset = filters.filter_related(
+            Book.objects.filter(user=self.user),
+            Book.tags.field,
+            [self.tag.id],
+            filters.MATCH_ALL
+        )
+
+        self.assertUsesIndex(queryset, 'book_tags_tag_book_idx')
+
+    def assertAutocompleteUsesIndex(self, model, index):
+        """Assert that both autocomplete modes scan the trigram index"""
+        if not search.has_trigram(connection.alias):
+            self.skipTest('Requires the pg_trgm extension')
+        # A name far rarer than the books of the user
+        model.objects.create(user=self.user, name='Zythum')
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        for mode, text in (('prefix', 'zyth'), ('contains', 'ythu')):
+            with self.subTest(mode=mode):
+                queryset = search.autocomplete(
+                    model.objects.filter(user=self.user),
+                    text,
+                    mode,
+                    10
+                )
+
+                self.assertUsesIndex(queryset, index)
+
+    def test_tags_autocomplete(self):
+        """Test the tag autocomplete searches the trigram index"""
+        self.assertAutocompleteUsesIndex(Tag, 'core_tag_name_trgm_idx')
+
+    def test_authors_autocomplete(self):
+        """Test the author autocomplete searches the trigram index"""
+        self.assertAutocompleteUsesIndex(Author, 'core_author_name_trgm_idx')
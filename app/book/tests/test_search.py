@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Author, Book
+
+from book.search import InvertedIndex
+
+
+BOOKS_URL = reverse('book:book-list')
+
+
+def sample_book(user, title):
+    """Create and return a sample book"""
+    return Book.objects.create(
+        user=user,
+        title=title,
+        pages=300,
+        year=1990,
+        price=10.00
+    )
+
+
+class BookSearchApiTests(TestCase):
+    """Test the full-text search of books"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text):
+        """Return the ids of the books found for the text"""
+        res = self.client.get(BOOKS_URL, {'q': text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [book['id'] for book in res.data]
+
+    def test_search_title(self):
+        """Test finding books by a word of their title"""
+        book = sample_book(self.user, 'The Name of the Rose')
+        sample_book(self.user, 'Foucault Pendulum')
+
+        self.assertEqual(self._search('rose'), [book.id])
+
+    def test_search_author_and_tag(self):
+        """Test finding books by the name of their authors and tags"""
+        book1 = sample_book(self.user, 'Baudolino')
+        book1.authors.add(Author.objects.create(user=self.user, name='Eco'))
+        book2 = sample_book(self.user, 'Dracula')
+        book2.tags.add(Tag.objects.create(user=self.user, name='Gothic'))
+
+        self.assertEqual(self._search('eco'), [book1.id])
+        self.assertEqual(self._search('gothic'), [book2.id])
+
+    def test_search_requires_every_word(self):
+        """Test that a book must contain every searched word"""
+        book = sample_book(self.user, 'War and Peace')
+        sample_book(self.user, 'The Art of War')
+
+        self.assertEqual(self._search('war peace'), [book.id])
+
+    def test_search_ranks_title_first(self):
+        """Test that a match in the title ranks above one in a tag"""
+        tagged = sample_book(self.user, 'Mrs Dalloway')
+        tagged.tags.add(Tag.objects.create(user=self.user, name='Modernism'))
+        titled = sample_book(self.user, 'Modernism explained')
+
+        self.assertEqual(self._search('modernism'), [titled.id, tagged.id])
+
+    def test_search_follows_renames(self):
+        """Test that renaming an author updates the search"""
+        book = sample_book(self.user, 'Ficciones')
+        author = Author.objects.create(user=self.user, name='Borges')
+        book.authors.add(author)
+
+        author.name = 'Cortazar'
+        author.save()
+
+        self.assertEqual(self._search('borges'), [])
+        self.assertEqual(self._search('cortazar'), [book.id])
+
+    def test_paginate_search(self):
+        """Test paginating a search keeps the books ordered by rank"""
+        tag = Tag.objects.create(user=self.user, name='Rose')
+        for title in ('Rose', 'The rose garden', 'Rose', 'Gardens'):
+            sample_book(self.user, title).tags.add(tag)
+        for title in ('A rose', 'Rose rose rose', 'Other'):
+            sample_book(self.user, title)
+        ranked = self._search('rose')
+
+        ids = []
+        res = self.client.get(BOOKS_URL, {'q': 'rose', 'page_size': 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [book['id'] for book in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, ranked)
+        self.assertEqual(len(ids), 6)
+
+    def test_search_limited_to_user(self):
+        """Test that only the books of the user are searched"""
+        other = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        sample_book(other, 'Hopscotch')
+
+        self.assertEqual(self._search('hopscotch'), [])
+
+
+class InvertedIndexTests(TestCase):
+    """Test the in-process full-text index"""
+
+    def test_rank_by_weight(self):
+        """Test that words weigh by the part of the book they are in"""
+        index = InvertedIndex()
+        index.add(1, 'Poems', ['Lorca'], [])
+        index.add(2, 'Lorca: a life', [], [])
+        index.add(3, 'Essays', [], ['Lorca'])
+
+        self.assertEqual(
+            [book_id for book_id, _ in index.search('LORCA')],
+            [2, 1, 3]
+        )
+
+    def test_empty_search(self):
+        """Test that a search without words finds nothing"""
+        index = InvertedIndex()
+        index.add(1, 'Poems', [], [])
+
+        self.assertEqual(index.search('...'), [])
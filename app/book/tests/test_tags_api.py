@@ -119,6 +119,8 @@ class PrivateTagsApiTests(TestCase):
             user=self.user
         )
         book.tags.add(tag1)
+        # Read the book count the link has updated
+        tag1.refresh_from_db()
 
         # Make HTTP request to get tags that are linked to
         # at least one book
@@ -161,3 +163,53 @@ class PrivateTagsApiTests(TestCase):
 
         # Check that only one tag is received
         self.assertEqual(len(res.data), 1)
+
+    def test_autocomplete_prefix(self):
+        """Test suggesting the tags starting with a prefix"""
+        Tag.objects.create(user=self.user, name='Horror')
+        Tag.objects.create(user=self.user, name='History')
+        Tag.objects.create(user=self.user, name='Thriller')
+
+        res = self.client.get(TAGS_URL, {'prefix': 'h'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(tag['name'] for tag in res.data),
+            ['History', 'Horror']
+        )
+
+    def test_autocomplete_contains(self):
+        """Test suggesting the tags containing a term, closest first"""
+        Tag.objects.create(user=self.user, name='Science fiction')
+        Tag.objects.create(user=self.user, name='Fiction')
+        Tag.objects.create(user=self.user, name='Poetry')
+
+        res = self.client.get(TAGS_URL, {'contains': 'fiction'})
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data],
+            ['Fiction', 'Science fiction']
+        )
+
+    def test_autocomplete_limit(self):
+        """Test that the number of suggestions is limited"""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        res = self.client.get(TAGS_URL, {'prefix': 'tag', 'limit': 2})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_autocomplete_invalid_limit(self):
+        """Test that a limit must be an integer"""
+        res = self.client.get(TAGS_URL, {'prefix': 'tag', 'limit': 'all'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_no_tag_detail(self):
+        """Test that tags are only listed, not retrieved one by one"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(f'{TAGS_URL}{tag.id}/')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,20 +1,35 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.relations import PrimaryKeyRelatedField
 
 from core.models import Tag, Author, Book
 
-from book import serializers
+from user.authentication import CachedTokenAuthentication
+
+from book import cache, exporters, filters, images, search, serializers
+from book.mixins import CachedListMixin, ColumnarListMixin, \
+    ConditionalGetMixin, ConditionalListMixin, RowListMixin
+from book.pagination import BookCursorPagination, BookAttrCursorPagination
 
 
-class BaseBookAttrViewSet(viewsets.GenericViewSet,
+class BaseBookAttrViewSet(ConditionalListMixin,
+                          CachedListMixin,
+                          viewsets.GenericViewSet,
                           mixins.ListModelMixin,
                           mixins.CreateModelMixin):
     """Manage tags in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = BookAttrCursorPagination
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
@@ -27,12 +42,60 @@ class BaseBookAttrViewSet(viewsets.GenericViewSet,
         # If the parameter was passed filter on the book not
         # being specified
         if assigned_only:
-            queryset = queryset.filter(book__isnull=False)
+            queryset = queryset.filter(self._assigned_to_book())
+
+        queryset = queryset.filter(user=self.request.user).order_by('-name')
+        # Get the autocomplete term if it was specified
+        mode, text = self._get_autocomplete()
+        if text:
+            queryset = search.autocomplete(
+                queryset,
+                text,
+                mode,
+                self._get_autocomplete_limit()
+            )
+
+        return queryset
+
+    def _get_autocomplete(self):
+        """Return the autocomplete mode and term of the request"""
+        for mode in ('prefix', 'contains'):
+            text = self.request.query_params.get(mode)
+            if text:
+                return mode, text
+
+        return None, None
+
+    def _get_autocomplete_limit(self):
+        """Return the number of autocomplete suggestions to send"""
+        try:
+            limit = int(self.request.query_params.get(
+                'limit',
+                settings.BOOK_AUTOCOMPLETE_LIMIT
+            ))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer'})
 
-        # Remove duplicates
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        return max(1, min(limit, settings.BOOK_AUTOCOMPLETE_MAX_LIMIT))
+
+    def paginate_queryset(self, queryset):
+        """Send autocomplete suggestions without pagination"""
+        if self._get_autocomplete()[1]:
+            # They are already limited to a few objects
+            return None
+
+        return super().paginate_queryset(queryset)
+
+    def _assigned_to_book(self):
+        """Return a condition on the object being linked to a book"""
+        # Check the through table with EXISTS instead of joining it,
+        # so each object is returned once without removing duplicates
+        field = self.book_field
+        links = field.remote_field.through.objects.filter(
+            **{field.m2m_reverse_field_name(): OuterRef('pk')}
+        )
+
+        return Exists(links)
 
     def perform_create(self, serializer):
         """Create a new object"""
@@ -43,20 +106,37 @@ class TagViewSet(BaseBookAttrViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    # Field linking books to tags
+    book_field = Book.tags.field
 
 
 class AuthorViewSet(BaseBookAttrViewSet):
     """Manage authors in the database"""
     queryset = Author.objects.all()
     serializer_class = serializers.AuthorSerializer
+    # Field linking books to authors
+    book_field = Book.authors.field
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin,
+                  CachedListMixin,
+                  ColumnarListMixin,
+                  RowListMixin,
+                  viewsets.ModelViewSet):
     """Manage books in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Book.objects.all()
     serializer_class = serializers.BookSerializer
+    pagination_class = BookCursorPagination
+    # Relations each action serializes, fetched in bulk so the
+    # number of queries does not grow with the number of books
+    prefetch_by_action = {
+        'list': ('tags', 'authors'),
+        'retrieve': ('tags', 'authors'),
+    }
+    # Actions whose fields can be chosen with ?fields=
+    sparse_actions = ('list', 'retrieve')
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
@@ -69,20 +149,128 @@ class BookViewSet(viewsets.ModelViewSet):
         tags = self.request.query_params.get('tags')
         # Get authors from the request if it was specified
         authors = self.request.query_params.get('authors')
+        # Match books having any of the ids, or all of them
+        match = filters.get_match(self.request.query_params)
         # Make copy of queryset as to not modify the original queryset
         queryset = self.queryset
         if tags:
             # Get list of ids specified
             tag_ids = self._params_to_ints(tags)
-            # Filter on the foreign key object with tags__id__in
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            # Filter on the links of the books to the tags
+            queryset = filters.filter_related(
+                queryset,
+                Book.tags.field,
+                tag_ids,
+                match
+            )
         if authors:
             # Get list of ids specified
             author_ids = self._params_to_ints(authors)
             # Filter by the author
-            queryset = queryset.filter(authors__id__in=author_ids)
+            queryset = filters.filter_related(
+                queryset,
+                Book.authors.field,
+                author_ids,
+                match
+            )
+        # Filter on the ranges of year, pages and price if specified
+        queryset = filters.filter_ranges(queryset, self.request.query_params)
+
+        queryset = self._prefetch_relations(queryset)
+        fields = self._get_fields()
+        if fields:
+            # Only read the columns of the fields that are sent
+            queryset = queryset.only(*self._get_columns(fields))
+        queryset = queryset.filter(user=self.request.user)
+        # Get the full-text search if it was specified
+        text = self.request.query_params.get('q')
+        if text:
+            # Annotates the rank the matching books are ordered by
+            queryset = search.search_books(queryset, text, self.request.user)
+
+        return queryset.order_by(*self.get_ordering())
+
+    def get_ordering(self):
+        """Return the ordering asked by the request, newest first if none,
+        or by relevance when searching"""
+        if self.request.query_params.get('q'):
+            return search.RANK_ORDERING
+
+        return filters.get_ordering(self.request.query_params)
+
+    def _prefetch_relations(self, queryset):
+        """Prefetch the relations serialized by the current action"""
+        fields = self._get_fields()
+        lookups = [
+            Prefetch(name, queryset=self._related_queryset(name))
+            for name in self.prefetch_by_action.get(self.action, ())
+            # Relations left out of the response are not fetched
+            if not fields or name in fields
+        ]
+
+        return queryset.prefetch_related(*lookups)
+
+    def _related_queryset(self, name):
+        """Return the objects of a relation of books, ordered by id"""
+        # A fixed order keeps the lists of ids the same on every request
+        model = Book._meta.get_field(name).related_model
+        return model.objects.order_by('id')
+
+    def _get_fields(self):
+        """Return the fields asked with ?fields=, None to send them all"""
+        fields = self.request.query_params.get('fields')
+        if not fields or self.action not in self.sparse_actions:
+            return None
+
+        fields = [name.strip() for name in fields.split(',')]
+        known = self.get_serializer_class().Meta.fields
+        unknown = [name for name in fields if name not in known]
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Unknown fields {", ".join(unknown)}'}
+            )
+
+        return fields
+
+    def _get_columns(self, fields):
+        """Return the model fields to load to serialize the fields"""
+        # The detail needs the modification time for Last-Modified and
+        # the pagination needs the values the books are ordered by
+        columns = {'updated_at'}
+        columns.update(
+            name.lstrip('-') for name in self.get_ordering()
+            # The rank is annotated by the search, it is not a column
+            if name not in search.RANK_ORDERING
+        )
+        serializer_fields = self.get_serializer_class()().fields
+        for name in fields:
+            source = serializer_fields[name].source
+            try:
+                field = Book._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if not field.many_to_many:
+                columns.add(source)
+
+        return columns
+
+    def get_row_serializer(self):
+        """Serialize the list from rows if the fast path is enabled"""
+        if not settings.BOOK_FAST_LIST:
+            return None
+
+        return serializers.BookRowSerializer(
+            fields=self._get_fields(),
+            ordering=self.get_ordering()
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        """Return a serializer of the fields asked by the request"""
+        fields = self._get_fields()
+        if fields:
+            kwargs['fields'] = fields
 
-        return queryset.filter(user=self.request.user)
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -90,6 +278,10 @@ class BookViewSet(viewsets.ModelViewSet):
             return serializers.BookDetailSerializer
         elif self.action == 'upload_image':
             return serializers.BookImageSerializer
+        elif self.action == 'bulk' and self.request.method == 'PUT':
+            return serializers.BookBulkUpdateSerializer
+        elif self.action == 'bulk':
+            return serializers.BookBulkSerializer
 
         return self.serializer_class
 
@@ -107,7 +299,14 @@ class BookViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            previous_thumbnails = book.image_thumbnails.values()
+            # The thumbnails are made in the background, respond as
+            # soon as the original image is stored
+            book = serializer.save(
+                image_status=Book.IMAGE_PENDING,
+                image_thumbnails={}
+            )
+            images.schedule_processing(book, previous_thumbnails)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -117,3 +316,153 @@ class BookViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    def _check_related_ids(self, items, field, model, errors):
+        """Add an error to each item referencing an unknown object"""
+        ids = {pk for item in items for pk in item[field]}
+        # A single query checks the ids of every item
+        existing = set(
+            model.objects.filter(
+                user=self.request.user,
+                id__in=ids
+            ).values_list('id', flat=True)
+        )
+        message = PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ]
+        for item, item_errors in zip(items, errors):
+            missing = [pk for pk in item[field] if pk not in existing]
+            if missing:
+                item_errors[field] = [
+                    message.format(pk_value=pk) for pk in missing
+                ]
+
+    @action(methods=['POST', 'PUT'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create, or update with PUT, a list of books in a single
+        transaction"""
+        if not isinstance(request.data, list):
+            return Response(
+                {'detail': 'Expected a list of books'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Every book of the list is written in the same transaction
+        if len(request.data) > settings.BOOK_BULK_MAX_SIZE:
+            return Response(
+                {'detail': f'Expected at most {settings.BOOK_BULK_MAX_SIZE} '
+                           'books'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            # One dictionary of errors per book, empty if it was valid
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = serializer.validated_data
+        errors = [{} for _ in items]
+        self._check_related_ids(items, 'tags', Tag, errors)
+        self._check_related_ids(items, 'authors', Author, errors)
+        if request.method == 'PUT':
+            books = self._get_bulk_books(items, errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        tag_ids = []
+        author_ids = []
+        for item in items:
+            # Remove repeated ids, a link can only be inserted once
+            tag_ids.append(list(dict.fromkeys(item.pop('tags'))))
+            author_ids.append(list(dict.fromkeys(item.pop('authors'))))
+
+        with transaction.atomic():
+            if request.method == 'PUT':
+                fields = set()
+                for book, item in zip(books, items):
+                    item.pop('id')
+                    fields.update(item)
+                    for name, value in item.items():
+                        setattr(book, name, value)
+                Book.objects.bulk_update_with_relations(
+                    books,
+                    sorted(fields),
+                    tag_ids,
+                    author_ids,
+                    batch_size=settings.BOOK_BULK_BATCH_SIZE
+                )
+            else:
+                books = Book.objects.bulk_create_with_relations(
+                    [Book(user=request.user, **item) for item in items],
+                    tag_ids,
+                    author_ids,
+                    batch_size=settings.BOOK_BULK_BATCH_SIZE
+                )
+        # Bulk writes do not send the signals that invalidate the cache
+        cache.invalidate_user(request.user.id)
+
+        written = self.queryset.filter(
+            pk__in=[book.pk for book in books]
+        ).prefetch_related('tags', 'authors').order_by('id')
+        return Response(
+            serializers.BookSerializer(written, many=True).data,
+            status=(
+                status.HTTP_200_OK if request.method == 'PUT'
+                else status.HTTP_201_CREATED
+            )
+        )
+
+    def _get_bulk_books(self, items, errors):
+        """Return the books of the user updated by the items, adding an
+        error to each item of an unknown or repeated book"""
+        # A single query reads every book to update
+        books = self.queryset.filter(
+            user=self.request.user,
+            id__in=[item['id'] for item in items]
+        ).in_bulk()
+        seen = set()
+        for item, item_errors in zip(items, errors):
+            if item['id'] not in books:
+                item_errors['id'] = ['Not found.']
+            elif item['id'] in seen:
+                item_errors['id'] = ['Repeated book.']
+            seen.add(item['id'])
+
+        return [books.get(item['id']) for item in items]
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream the books of the user as NDJSON or CSV"""
+        # 'format' is taken by the content negotiation of the framework
+        export_format = request.query_params.get('type', 'ndjson')
+        if export_format not in exporters.CONTENT_TYPES:
+            formats = ', '.join(exporters.CONTENT_TYPES)
+            return Response(
+                {'type': f'Expected one of {formats}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(
+            exporters.stream(
+                self.get_queryset(),
+                export_format,
+                settings.BOOK_EXPORT_CHUNK_SIZE
+            ),
+            content_type=exporters.CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="books.{export_format}"'
+
+        return response
+
+    @action(methods=['GET'], detail=False, url_path='stats')
+    def stats(self, request):
+        """Return statistics of the books grouped by year, tag or author"""
+        stats = filters.get_stats(
+            self.get_queryset(),
+            request.query_params.get('group_by', 'year')
+        )
+
+        return Response(list(stats))
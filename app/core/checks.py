@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.security, deploy=True)
+def check_password_hasher(app_configs, **kwargs):
+    """Warn when new passwords are hashed with the test hasher"""
+    if settings.PASSWORD_HASHERS[0].endswith('.MD5PasswordHasher'):
+        return [Warning(
+            'Passwords are hashed with MD5, which is only meant for tests',
+            hint='Set PASSWORD_HASHER to pbkdf2, argon2 or bcrypt.',
+            id='core.W001',
+        )]
+
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_book_cache(app_configs, **kwargs):
+    """Warn when the book API caches in the memory of each process"""
+    alias = settings.BOOK_CACHE_ALIAS
+    if alias and settings.CACHES[alias]['BACKEND'].endswith('LocMemCache'):
+        return [Warning(
+            'The book API caches responses and ETags in each process, a '
+            'write leaves the other processes serving stale data',
+            hint='Set BOOK_CACHE_ALIAS to a cache shared by the servers, '
+                 'or to an empty value to turn the cache off.',
+            id='core.W002',
+        )]
+
+    return []
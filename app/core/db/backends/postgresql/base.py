@@ -0,0 +1,157 @@
+import os
+import threading
+
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+from core.db.backends.postgresql.pool import ConnectionPool, PoolTimeout
+
+
+Database = base.Database
+
+# Pools of each process, by database and connection parameters
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, config):
+    """Return the pool of connections with the given parameters"""
+    # A forked process must not share the connections of its parent
+    key = (os.getpid(), alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                config.get('MAX_SIZE', 10),
+                config.get('TIMEOUT', 10)
+            )
+
+    return pool
+
+
+def close_pools():
+    """Close the idle connections of every pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def _ping(connection):
+    """Return whether a connection answers a query"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+
+    return True
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections would keep the test database in use
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend with health checks and an optional pool
+
+    Reads two settings of the database besides those of Django:
+        - CONN_HEALTH_CHECKS: check a reused connection works before
+          its first query in each request, as Django 4.1 does
+        - POOL: {'MAX_SIZE': ..., 'TIMEOUT': ...} keep the connections
+          closed by the threads of the process open in a pool, and wait
+          up to TIMEOUT seconds for one when MAX_SIZE are in use
+    """
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self._pool = None
+
+    def get_new_connection(self, conn_params):
+        config = self.settings_dict.get('POOL')
+        if not config:
+            self._pool = None
+            return super().get_new_connection(conn_params)
+
+        self._pool = get_pool(self.alias, conn_params, config)
+        while True:
+            try:
+                connection, new = self._pool.get(
+                    lambda: super(DatabaseWrapper, self).get_new_connection(
+                        conn_params
+                    )
+                )
+            except PoolTimeout as error:
+                raise Database.OperationalError(str(error)) from error
+            if new:
+                return connection
+            # The server may have closed it while idle in the pool
+            if not connection.closed and (
+                not self.settings_dict.get('CONN_HEALTH_CHECKS') or
+                _ping(connection)
+            ):
+                break
+            self._pool.discard(connection)
+
+        # As set on the connection when it was made
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level',
+            connection.isolation_level
+        )
+
+        return connection
+
+    def connect(self):
+        super().connect()
+        # Connections are new, or checked when taken from the pool
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Called as each request starts and finishes
+        self.health_check_done = False
+
+    def _cursor(self, name=None):
+        self._close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def _close_if_health_check_failed(self):
+        """Close the connection if it does not work, once per request"""
+        if (
+            self.connection is None or
+            self.health_check_done or
+            # Reconnecting would lose the transaction silently
+            self.in_atomic_block or
+            not self.settings_dict.get('CONN_HEALTH_CHECKS')
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _close(self):
+        if self._pool is None or self.connection is None:
+            return super()._close()
+
+        connection = self.connection
+        idle = extensions.TRANSACTION_STATUS_IDLE
+        with self.wrap_database_errors:
+            try:
+                # Never hand out a connection inside a transaction
+                if not connection.closed and \
+                        connection.get_transaction_status() != idle:
+                    connection.rollback()
+                reusable = not connection.closed and \
+                    connection.get_transaction_status() == idle
+            except Database.Error:
+                reusable = False
+            if reusable:
+                self._pool.put(connection)
+            else:
+                self._pool.discard(connection)
@@ -0,0 +1,69 @@
+import threading
+
+
+class PoolTimeout(Exception):
+    """Every connection of the pool stayed in use for the timeout"""
+
+
+class ConnectionPool:
+    """Connections to a database shared by the threads of a process
+
+    At most max_size connections are open at once. The idle ones are
+    handed out most recently used first, so the others may time out on
+    the server side rather than the busy ones.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+
+    def get(self, connect):
+        """Return an idle connection, or a new one made by connect(),
+        and whether it is new
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._idle or self._open < self.max_size,
+                self.timeout
+            ):
+                raise PoolTimeout(
+                    f'No connection free in {self.timeout} seconds, '
+                    f'the {self.max_size} of the pool are in use'
+                )
+            if self._idle:
+                return self._idle.pop(), False
+            self._open += 1
+
+        try:
+            return connect(), True
+        except BaseException:
+            self._forget()
+            raise
+
+    def put(self, connection):
+        """Give back a connection to hand out again"""
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Close a connection that cannot be handed out again"""
+        try:
+            connection.close()
+        finally:
+            self._forget()
+
+    def close(self):
+        """Close the idle connections"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self.discard(connection)
+
+    def _forget(self):
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
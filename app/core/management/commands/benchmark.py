@@ -0,0 +1,40 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.utils import benchmark_database, write_results
+
+
+class Command(BaseCommand):
+    """Django command to run one of the benchmarks on a test database"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Module name in benchmarks/ '
+                                         'without the bench_ prefix')
+        parser.add_argument('--sizes', nargs='+', type=int,
+                            help='Dataset sizes to run the benchmark at')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per measurement, the best is kept')
+        parser.add_argument('--output',
+                            help='JSON file to write the results to')
+
+    def handle(self, *args, **options):
+        try:
+            module = import_module(f'benchmarks.bench_{options["name"]}')
+        except ImportError:
+            raise CommandError(f'Unknown benchmark {options["name"]}')
+
+        self.stdout.write(f'Running benchmark {options["name"]}...')
+        with benchmark_database():
+            results = module.run(
+                self.stdout,
+                sizes=options['sizes'],
+                repeat=options['repeat']
+            )
+            if options['output']:
+                write_results(options['output'], options['name'], {
+                    'sizes': options['sizes'],
+                    'repeat': options['repeat'],
+                }, results)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished!'))
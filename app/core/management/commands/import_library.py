@@ -0,0 +1,180 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Tag, Author, Book
+
+from book import cache
+from book.exporters import CSV_LIST_SEPARATOR
+
+
+# Columns of a book read from the file, besides its relations
+BOOK_FIELDS = ('title', 'pages', 'year', 'price', 'link')
+
+
+class InvalidRow(ValueError):
+    """Line of the file that could not be read as a row"""
+
+    def __init__(self, line, message):
+        super().__init__(message)
+        self.line = line
+
+
+def read_ndjson(file):
+    """Yield a dictionary for each line of JSON, or an InvalidRow for
+    each line that is not a JSON object"""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            # Reported and skipped as the invalid rows, the batches
+            # before it are already written
+            yield InvalidRow(number, error)
+            continue
+        if isinstance(row, dict):
+            yield row
+        else:
+            yield InvalidRow(number, 'Expected a JSON object')
+
+
+def read_csv(file):
+    """Yield a dictionary for each CSV row, splitting the name lists"""
+    for row in csv.DictReader(file):
+        for field in ('tags', 'authors'):
+            value = row.get(field) or ''
+            row[field] = value.split(CSV_LIST_SEPARATOR) if value else []
+        yield row
+
+
+READERS = {'ndjson': read_ndjson, 'csv': read_csv}
+
+
+class Command(BaseCommand):
+    """Django command to import a library of books for a user"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON or CSV file to import')
+        parser.add_argument('--user', required=True,
+                            help='Email of the user owning the books')
+        parser.add_argument('--type', choices=READERS,
+                            help='File format, taken from the extension '
+                                 'when not given')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Books written per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist')
+
+        file_type = options['type'] or \
+            os.path.splitext(options['path'])[1].lstrip('.')
+        if file_type not in READERS:
+            raise CommandError(f'Unknown file type {file_type}')
+
+        self.batch_size = options['batch_size']
+        # Existing names are loaded once, new ones are added as found
+        self.tag_ids = dict(
+            Tag.objects.filter(user=user).values_list('name', 'id')
+        )
+        self.author_ids = dict(
+            Author.objects.filter(user=user).values_list('name', 'id')
+        )
+
+        imported = 0
+        skipped = 0
+        start = time.perf_counter()
+        with open(options['path'], newline='') as file:
+            rows = READERS[file_type](file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+
+                created, invalid = self._import_batch(user, batch)
+                imported += created
+                skipped += invalid
+                if options['verbosity'] > 1:
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'{imported} books ({imported / elapsed:.0f} rows/s)'
+                    )
+
+        # Bulk inserts do not send the signals that invalidate the cache
+        cache.invalidate_user(user.id)
+
+        elapsed = time.perf_counter() - start
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {skipped} invalid rows'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} books in {elapsed:.2f}s '
+            f'({imported / elapsed:.0f} rows/s)'
+        ))
+
+    def _import_batch(self, user, rows):
+        """Write a batch of rows, return the created and skipped counts"""
+        books = []
+        tags = []
+        authors = []
+        for row in rows:
+            if isinstance(row, InvalidRow):
+                self.stderr.write(f'Skipping line {row.line}: {row}')
+                continue
+            book = Book(
+                user=user,
+                **{field: row[field] for field in BOOK_FIELDS if field in row}
+            )
+            try:
+                book.clean_fields(exclude=('user', 'image'))
+            except ValidationError as error:
+                self.stderr.write(f'Skipping {row.get("title")!r}: {error}')
+                continue
+            books.append(book)
+            tags.append(row.get('tags') or [])
+            authors.append(row.get('authors') or [])
+
+        with transaction.atomic():
+            tag_ids = self._resolve(user, Tag, self.tag_ids, tags)
+            author_ids = self._resolve(user, Author, self.author_ids, authors)
+            Book.objects.bulk_create_with_relations(
+                books,
+                tag_ids,
+                author_ids,
+                batch_size=self.batch_size
+            )
+
+        return len(books), len(rows) - len(books)
+
+    def _resolve(self, user, model, ids, names_per_book):
+        """Return the ids of the names, creating the unknown ones"""
+        new_names = {
+            name
+            for names in names_per_book
+            for name in names
+            if name not in ids
+        }
+        if new_names:
+            created = model.objects.bulk_create(
+                model(user=user, name=name) for name in new_names
+            )
+            if any(obj.pk is None for obj in created):
+                # The database did not return the ids of the new rows
+                created = model.objects.filter(user=user, name__in=new_names)
+            ids.update((obj.name, obj.pk) for obj in created)
+
+        return [
+            list(dict.fromkeys(ids[name] for name in names))
+            for names in names_per_book
+        ]
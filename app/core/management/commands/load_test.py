@@ -0,0 +1,92 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from benchmarks import load
+from benchmarks.seed import seed_library
+from benchmarks.utils import benchmark_database, write_results
+
+
+MODES = ('client', 'wsgi')
+
+
+class Command(BaseCommand):
+    """Django command to load test the APIs on a seeded test database"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5,
+                            help='Users to seed')
+        parser.add_argument('--books', type=int, default=1000,
+                            help='Books of each user')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Requests sent to each endpoint')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Clients sending requests at the same '
+                                 'time to the WSGI server')
+        parser.add_argument('--mode', choices=MODES, nargs='+',
+                            default=list(MODES),
+                            help='Drive the APIs through the APIClient, '
+                                 'a threaded WSGI server or both')
+        parser.add_argument('--output',
+                            help='JSON file to write the results to')
+
+    def handle(self, *args, **options):
+        # Every client sends from this host, the token requests would be
+        # throttled as coming from a single IP
+        throttle = dict(settings.TOKEN_THROTTLE, ENABLED=False)
+        with benchmark_database(), override_settings(TOKEN_THROTTLE=throttle):
+            self.stdout.write(
+                f'Seeding {options["users"]} users with '
+                f'{options["books"]} books...'
+            )
+            users = load.prepare(seed_library(
+                options['users'],
+                options['books']
+            ))
+
+            results = {}
+            for mode in options['mode']:
+                self.stdout.write(f'Sending requests ({mode})...')
+                if mode == 'client':
+                    scenarios = load.run_client(users, options['requests'])
+                else:
+                    scenarios = load.run_wsgi(
+                        users,
+                        options['requests'],
+                        options['workers']
+                    )
+                results[mode] = {
+                    'endpoints': scenarios,
+                    'total': load.totals(scenarios),
+                }
+                self._write_table(scenarios)
+
+            config = {
+                name: options[name]
+                for name in ('users', 'books', 'requests', 'workers')
+            }
+            if options['output']:
+                write_results(options['output'], 'load', config, results)
+            else:
+                self.stdout.write(json.dumps(results, indent=2))
+
+        self.stdout.write(self.style.SUCCESS('Load test finished!'))
+
+    def _write_table(self, scenarios):
+        """Write the summary of each scenario"""
+        self.stdout.write(
+            f'{"endpoint":<20} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"queries":>8} {"req/s":>8} {"errors":>7}'
+        )
+        for name, result in scenarios.items():
+            queries = result['queries_per_request']
+            queries = '-' if queries is None else f'{queries:.1f}'
+            self.stdout.write(
+                f'{name:<20} {result["p50_ms"]:>8.2f} '
+                f'{result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+                f'{queries:>8} '
+                f'{result["requests_per_second"]:>8.1f} '
+                f'{result["errors"]:>7}'
+            )
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Tag, Author
+
+from book import cache
+
+
+class Command(BaseCommand):
+    """Django command to recompute the book counts of tags and authors"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user',
+                            help='Email of the only user to recount')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['user']:
+            users = users.filter(email=options['user'])
+            if not users.exists():
+                raise CommandError(f'User {options["user"]} does not exist')
+
+        tags = Tag.objects.filter(user__in=users).recount_books()
+        authors = Author.objects.filter(user__in=users).recount_books()
+
+        # Updates do not send the signals that invalidate the cache
+        for user_id in users.values_list('id', flat=True):
+            cache.invalidate_user(user_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted the books of {tags} tags and {authors} authors'
+        ))
@@ -0,0 +1,48 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    """Django command to show the request measures of each view"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true',
+                            help='Write the measures as JSON')
+        parser.add_argument('--reset', action='store_true',
+                            help='Forget the measures after showing them')
+
+    def handle(self, *args, **options):
+        views = metrics.collect()
+        if options['json']:
+            self.stdout.write(json.dumps(views, indent=2))
+        elif not views:
+            alias = settings.REQUEST_METRICS['CACHE_ALIAS']
+            self.stdout.write(
+                'No requests measured. The servers share their measures '
+                f'through the {alias!r} cache, which must not be local '
+                'to each process.'
+            )
+        else:
+            self.stdout.write(
+                f'{"view":<30} {"requests":>8} {"p50 ms":>8} {"p95 ms":>8} '
+                f'{"p99 ms":>8} {"db ms":>8} {"queries":>8} '
+                f'{"throttled":>9}'
+            )
+            for view_name, measures in views.items():
+                total = measures['total']
+                # Missing from the measures published by older versions
+                throttled = measures.get('throttled', {}).get('total', 0)
+                self.stdout.write(
+                    f'{view_name:<30} {total["count"]:>8} '
+                    f'{total["p50"]:>8.1f} {total["p95"]:>8.1f} '
+                    f'{total["p99"]:>8.1f} {measures["db"]["mean"]:>8.1f} '
+                    f'{measures["queries"]["mean"]:>8.1f} '
+                    f'{throttled:>9}'
+                )
+
+        if options['reset']:
+            metrics.reset()
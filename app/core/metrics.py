@@ -0,0 +1,207 @@
+import bisect
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Upper bounds of the histogram buckets of durations (ms) and queries
+DURATION_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+# Requests are counted as 0, or 1 when throttled
+THROTTLED_BUCKETS = (0,)
+# Measures of every request, see core.middleware
+MEASURES = {
+    'total': DURATION_BUCKETS,
+    'db': DURATION_BUCKETS,
+    'view': DURATION_BUCKETS,
+    'render': DURATION_BUCKETS,
+    'queries': QUERY_BUCKETS,
+    'throttled': THROTTLED_BUCKETS,
+}
+
+# Cache keys of the metrics published by each process
+INDEX_KEY = 'request-metrics:processes'
+PROCESS_KEY = f'request-metrics:{socket.gethostname()}:{os.getpid()}'
+
+
+class Histogram:
+    """Count of values in fixed buckets, mergeable across processes"""
+
+    def __init__(self, bounds, counts=None, total=0, maximum=0):
+        self.bounds = tuple(bounds)
+        # The last bucket counts the values above every bound
+        self.counts = list(counts or [0] * (len(self.bounds) + 1))
+        self.total = total
+        self.maximum = maximum
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def add(self, value):
+        """Count a value"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other):
+        """Add the values counted by another histogram"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def percentile(self, fraction):
+        """Return the bound of the bucket holding the given fraction"""
+        count = self.count
+        if not count:
+            return 0
+        seen = 0
+        for bound, bucket in zip(self.bounds, self.counts):
+            seen += bucket
+            if seen >= fraction * count:
+                # No value is above the largest one seen
+                return min(bound, self.maximum)
+
+        return self.maximum
+
+    def summary(self):
+        """Return the count, total, mean, percentiles and maximum"""
+        count = self.count
+        return {
+            'count': count,
+            'total': self.total,
+            'mean': self.total / count if count else 0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.maximum,
+        }
+
+    def to_dict(self):
+        return {
+            'bounds': self.bounds,
+            'counts': self.counts,
+            'total': self.total,
+            'maximum': self.maximum,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class Registry:
+    """Histograms of the measures of the requests to each view"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._published_at = time.monotonic()
+
+    def record(self, view_name, measures):
+        """Count the measures of a request to the view"""
+        with self._lock:
+            histograms = self._views.get(view_name)
+            if histograms is None:
+                histograms = self._views[view_name] = {
+                    name: Histogram(bounds)
+                    for name, bounds in MEASURES.items()
+                }
+            for name, value in measures.items():
+                histograms[name].add(value)
+            publish = time.monotonic() - self._published_at >= \
+                settings.REQUEST_METRICS['PUBLISH_INTERVAL']
+
+        if publish:
+            self.publish()
+
+    def snapshot(self):
+        """Return the histograms of every view as dictionaries"""
+        with self._lock:
+            return {
+                view_name: {
+                    name: histogram.to_dict()
+                    for name, histogram in histograms.items()
+                }
+                for view_name, histograms in self._views.items()
+            }
+
+    def publish(self):
+        """Share the histograms of this process through the cache"""
+        self._published_at = time.monotonic()
+        cache = _cache()
+        # Expires unless published again, so the measures of stopped or
+        # restarted processes are dropped
+        cache.set(
+            PROCESS_KEY,
+            self.snapshot(),
+            settings.REQUEST_METRICS['PROCESS_TTL']
+        )
+        # The index is updated without a lock, a key lost to concurrent
+        # updates is added back on the next publication of its process
+        processes = cache.get(INDEX_KEY, [])
+        if PROCESS_KEY not in processes:
+            cache.set(INDEX_KEY, processes + [PROCESS_KEY], None)
+
+    def reset(self):
+        """Forget the requests counted by every process"""
+        with self._lock:
+            self._views = {}
+        cache = _cache()
+        cache.delete_many(cache.get(INDEX_KEY, []) + [INDEX_KEY])
+
+
+registry = Registry()
+
+
+def _cache():
+    return caches[settings.REQUEST_METRICS['CACHE_ALIAS']]
+
+
+def record(view_name, measures):
+    """Count the measures of a request to the view"""
+    registry.record(view_name, measures)
+
+
+def collect():
+    """Return the summary of the measures of each view, all processes"""
+    registry.publish()
+    cache = _cache()
+    processes = cache.get(INDEX_KEY, [])
+    snapshots = cache.get_many(processes)
+    expired = set(processes) - set(snapshots)
+    if expired:
+        # Read again to keep the keys added meanwhile
+        cache.set(
+            INDEX_KEY,
+            [key for key in cache.get(INDEX_KEY, []) if key not in expired],
+            None
+        )
+
+    merged = {}
+    for snapshot in snapshots.values():
+        for view_name, histograms in snapshot.items():
+            view = merged.setdefault(view_name, {})
+            for name, data in histograms.items():
+                histogram = Histogram.from_dict(data)
+                if name in view:
+                    view[name].merge(histogram)
+                else:
+                    view[name] = histogram
+
+    return {
+        view_name: {
+            name: histogram.summary()
+            for name, histogram in histograms.items()
+        }
+        for view_name, histograms in sorted(merged.items())
+    }
+
+
+def reset():
+    """Forget the requests counted by every process"""
+    registry.reset()
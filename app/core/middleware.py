@@ -0,0 +1,90 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import metrics
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries and their time"""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += time.perf_counter() - start
+
+
+class RequestMetricsMiddleware:
+    """Measure the queries and time of each request
+
+    The measures are sent in the Server-Timing header and counted in
+    the histograms of the view, see core.metrics:
+        - total: the whole request, without streamed content
+        - db: time running queries, and queries: how many
+        - view: time in the view other than queries, mostly serializing
+        - render: time rendering the response, e.g. into JSON
+        - throttled: 1 when the request was throttled, 0 otherwise
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        counter = QueryCounter()
+        request._metrics = {'counter': counter}
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        marks = request._metrics
+        if 'view_start' not in marks:
+            # Never reached a view, e.g. the URL was not found
+            return response
+        # Responses that are not rendered finish with the view
+        view_end, view_db = marks.get('view_end', (end, counter.duration))
+        view_start, start_db = marks['view_start']
+        measures = {
+            'total': (end - start) * 1000,
+            'db': counter.duration * 1000,
+            'view': ((view_end - view_start) - (view_db - start_db)) * 1000,
+            'render': (end - view_end) * 1000 if 'view_end' in marks else 0,
+            'queries': counter.queries,
+            'throttled': int(response.status_code == 429),
+        }
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={measures[name]:.2f}'
+            for name in ('total', 'db', 'view', 'render')
+        ) + f', queries;desc="{counter.queries}"'
+        metrics.record(request.resolver_match.view_name, measures)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Mark the start of the view"""
+        counter = request._metrics['counter']
+        request._metrics['view_start'] = (
+            time.perf_counter(),
+            counter.duration
+        )
+
+    def process_template_response(self, request, response):
+        """Mark the end of the view, the response is rendered next"""
+        counter = request._metrics['counter']
+        request._metrics['view_end'] = (time.perf_counter(), counter.duration)
+
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_book_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['user', 'name'], name='author_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['user', 'id'], name='book_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name'], name='tag_user_name_idx'),
+        ),
+        # The auto-created through tables only index (book_id, tag_id),
+        # add the reverse pair for lookups starting from a tag or author
+        migrations.RunSQL(
+            sql='CREATE INDEX book_tags_tag_book_idx '
+                'ON core_book_tags (tag_id, book_id)',
+            reverse_sql='DROP INDEX book_tags_tag_book_idx',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX book_authors_author_book_idx '
+                'ON core_book_authors (author_id, book_id)',
+            reverse_sql='DROP INDEX book_authors_author_book_idx',
+        ),
+    ]
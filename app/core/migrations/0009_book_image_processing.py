@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='image_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
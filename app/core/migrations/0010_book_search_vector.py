@@ -0,0 +1,62 @@
+# Generated by Django 3.2.25 on 2026-10-17 07:05
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+# The full-text document of every book as of this migration, copied so
+# later changes to the models do not change what it does
+SEARCH_VECTOR_SQL = """
+    UPDATE core_book SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, title), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(author.name, ' ')
+            FROM core_author author
+            JOIN core_book_authors link ON link.author_id = author.id
+            WHERE link.book_id = core_book.id
+        ), '')), 'B') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(tag.name, ' ')
+            FROM core_tag tag
+            JOIN core_book_tags link ON link.tag_id = tag.id
+            WHERE link.book_id = core_book.id
+        ), '')), 'C')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """Index and fill the full-text documents on Postgres"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX book_search_vector_idx '
+        'ON core_book USING gin (search_vector)'
+    )
+    # A single statement fills the documents of every book, in the
+    # configuration the searches of this deployment are made with
+    schema_editor.execute(SEARCH_VECTOR_SQL, {
+        'config': getattr(settings, 'BOOK_SEARCH_CONFIG', 'english'),
+    })
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX book_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_book_image_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
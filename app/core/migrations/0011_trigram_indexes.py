@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-17 07:40
+
+from django.db import migrations
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Index the names for LIKE and similarity searches on Postgres"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            # Servers built without contrib fall back to plain lookups
+            return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('core_tag', 'core_author'):
+        schema_editor.execute(
+            f'CREATE INDEX {table}_name_trgm_idx '
+            f'ON {table} USING gin (name gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table in ('core_tag', 'core_author'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.25 on 2026-10-17 10:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_books(apps, schema_editor):
+    """Fill the book counts of the existing tags and authors"""
+    # Counted here rather than with the helpers of the models, so later
+    # changes to them do not change what this migration does
+    for name in ('Tag', 'Author'):
+        model = apps.get_model('core', name)
+        field = model._meta.get_field('book').field
+        related_name = field.m2m_reverse_field_name()
+        links = field.remote_field.through.objects.filter(
+            **{related_name: OuterRef('pk')}
+        ).order_by().values(related_name).annotate(
+            count=Count('pk')
+        ).values('count')
+        model.objects.using(schema_editor.connection.alias).update(
+            book_count=Coalesce(Subquery(links), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_books, migrations.RunPython.noop),
+    ]
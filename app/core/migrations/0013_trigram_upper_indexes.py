@@ -0,0 +1,55 @@
+# Generated by Django 3.2.25 on 2026-10-17 16:20
+
+from django.db import migrations
+
+
+def create_upper_trigram_indexes(apps, schema_editor):
+    """Index the uppercase names the case-insensitive lookups compare"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            # Not installed by 0011, the lookups scan the names
+            return
+
+    # istartswith and icontains compare UPPER(name::text) with LIKE, an
+    # index on the plain name is never used for them
+    for table in ('core_tag', 'core_author'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_name_trgm_idx')
+        schema_editor.execute(
+            f'CREATE INDEX {table}_name_trgm_idx '
+            f'ON {table} USING gin ((UPPER(name::text)) gin_trgm_ops)'
+        )
+
+
+def create_plain_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+
+    for table in ('core_tag', 'core_author'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_name_trgm_idx')
+        schema_editor.execute(
+            f'CREATE INDEX {table}_name_trgm_idx '
+            f'ON {table} USING gin (name gin_trgm_ops)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_book_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_upper_trigram_indexes,
+            create_plain_trigram_indexes
+        ),
+    ]
@@ -1,8 +1,13 @@
 import uuid
 import os
 import datetime
+from collections import defaultdict
 
-from django.db import models
+from django.db import models, connections
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 
@@ -20,6 +25,27 @@ def book_image_file_path(instance, filename):
     return os.path.join('uploads/book/', filename)
 
 
+# Full-text document of books: the title weighs the most, then the
+# author names and then the tag names
+SEARCH_VECTOR_SQL = """
+    UPDATE core_book SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, title), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(author.name, ' ')
+            FROM core_author author
+            JOIN core_book_authors link ON link.author_id = author.id
+            WHERE link.book_id = core_book.id
+        ), '')), 'B') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(tag.name, ' ')
+            FROM core_tag tag
+            JOIN core_book_tags link ON link.tag_id = tag.id
+            WHERE link.book_id = core_book.id
+        ), '')), 'C')
+    WHERE id = ANY(%(ids)s)
+"""
+
+
 def year_choices():
     """ Helper fuction for creating a list of possible publication years"""
     return [(r, r) for r in range(1500, datetime.date.today().year+1)]
@@ -30,6 +56,16 @@ def current_year():
     return datetime.date.today().year
 
 
+def book_count(field):
+    """Return the number of books linked to each object through field"""
+    name = field.m2m_reverse_field_name()
+    links = field.remote_field.through.objects.filter(
+        **{name: OuterRef('pk')}
+    ).order_by().values(name).annotate(count=Count('pk')).values('count')
+
+    return Coalesce(Subquery(links), 0)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -52,6 +88,156 @@ class UserManager(BaseUserManager):
         return user
 
 
+class BookCountQuerySet(models.QuerySet):
+    """Objects counting the books linked to them"""
+
+    def add_book_counts(self, deltas):
+        """Add to the book counts, deltas maps object ids to amounts"""
+        # One statement per distinct amount, usually one or two
+        ids_by_delta = defaultdict(list)
+        for pk, delta in deltas.items():
+            if delta:
+                ids_by_delta[delta].append(pk)
+        for delta, ids in ids_by_delta.items():
+            # Never below zero, should the counts have drifted
+            self.filter(pk__in=ids).update(
+                book_count=Greatest(F('book_count') + delta, 0)
+            )
+
+    def recount_books(self):
+        """Recompute the book counts from the links, return the objects"""
+        field = self.model._meta.get_field('book').field
+        return self.update(book_count=book_count(field))
+
+
+class BookManager(models.Manager):
+
+    def bulk_create_with_relations(self, books, tag_ids, author_ids,
+                                   batch_size=None):
+        """Insert books and their tag and author links in batches
+            - books: list of unsaved book objects
+            - tag_ids: list with the tag ids of each book
+            - author_ids: list with the author ids of each book
+        """
+        if connections[self.db].features.can_return_rows_from_bulk_insert:
+            books = self.bulk_create(books, batch_size=batch_size)
+        else:
+            # The ids are needed for the links but the database does not
+            # return them from a bulk insert
+            for book in books:
+                book.save(using=self.db)
+
+        self._add_relations(books, tag_ids, author_ids, batch_size)
+
+        return books
+
+    def bulk_update_with_relations(self, books, fields, tag_ids, author_ids,
+                                   batch_size=None):
+        """Update books and replace their tag and author links in batches
+            - books: list of saved book objects with the new values
+            - fields: names of the fields of the books to write
+            - tag_ids: list with the new tag ids of each book
+            - author_ids: list with the new author ids of each book
+        """
+        # Bulk updates skip auto_now, mark the books as modified
+        now = timezone.now()
+        for book in books:
+            book.updated_at = now
+        self.bulk_update(
+            books,
+            list(fields) + ['updated_at'],
+            batch_size=batch_size
+        )
+        self._add_relations(
+            books,
+            tag_ids,
+            author_ids,
+            batch_size,
+            replace=True
+        )
+
+        return books
+
+    def _add_relations(self, books, tag_ids, author_ids, batch_size,
+                       replace=False):
+        """Link the books to their tags and authors, replacing the
+        current links when replace is set"""
+        book_ids = [book.pk for book in books]
+        # Insert the rows of the through tables directly, one
+        # statement per batch instead of one per relation
+        for field, related_ids in (
+            (self.model.tags.field, tag_ids),
+            (self.model.authors.field, author_ids),
+        ):
+            through = field.remote_field.through
+            book_column = field.m2m_column_name()
+            column = field.m2m_reverse_name()
+            # Links written directly do not send the signals that
+            # maintain the book counts
+            deltas = defaultdict(int)
+            if replace:
+                links = through.objects.using(self.db).filter(
+                    **{f'{book_column}__in': book_ids}
+                )
+                for pk in links.values_list(column, flat=True):
+                    deltas[pk] -= 1
+                links.delete()
+            through.objects.using(self.db).bulk_create(
+                (
+                    through(**{book_column: book.pk, column: pk})
+                    for book, pks in zip(books, related_ids)
+                    for pk in pks
+                ),
+                batch_size=batch_size
+            )
+            for pks in related_ids:
+                for pk in pks:
+                    deltas[pk] += 1
+            field.related_model.objects.db_manager(self.db).add_book_counts(
+                deltas
+            )
+
+        self.update_search_vectors(book_ids)
+
+    def related_values(self, field, value, ordering=(), **filters):
+        """Return a map of book id to the values of its related objects,
+        read from the through table in one query
+            - field: many-to-many field of the books, e.g. Book.tags.field
+            - value: field of the related objects, e.g. 'id' or 'name'
+            - ordering: fields of the through table to order the values by
+            - filters: lookups of the books to read, e.g. id__in=book_ids
+        """
+        book_name = field.m2m_field_name()
+        rows = field.remote_field.through.objects.using(self.db).filter(
+            **{f'{book_name}__{lookup}': v for lookup, v in filters.items()}
+        ).values_list(
+            field.m2m_column_name(),
+            f'{field.m2m_reverse_field_name()}__{value}'
+        ).order_by(*ordering)
+
+        values = defaultdict(list)
+        for book_id, related in rows:
+            values[book_id].append(related)
+
+        return values
+
+    def update_search_vectors(self, book_ids):
+        """Recompute the full-text document of the books"""
+        connection = connections[self.db]
+        # Other databases search without a stored document
+        if connection.vendor != 'postgresql':
+            return
+        book_ids = list(book_ids)
+        if not book_ids:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute(SEARCH_VECTOR_SQL, {
+                'config': settings.BOOK_SEARCH_CONFIG,
+                'ids': book_ids,
+            })
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     """Custom user model that suppors using email instead of username"""
     email = models.EmailField(max_length=255, unique=True)
@@ -73,6 +259,18 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Last time the object changed, used for conditional requests
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of books linked to the object, kept up to date by signals
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = BookCountQuerySet.as_manager()
+
+    class Meta:
+        # Listing filters on the user and orders by name
+        indexes = [
+            models.Index(fields=['user', 'name'], name='tag_user_name_idx'),
+        ]
 
     # Define the string representation of the Tag
     def __str__(self):
@@ -88,6 +286,18 @@ class Author(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Last time the object changed, used for conditional requests
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of books linked to the object, kept up to date by signals
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = BookCountQuerySet.as_manager()
+
+    class Meta:
+        # Listing filters on the user and orders by name
+        indexes = [
+            models.Index(fields=['user', 'name'], name='author_user_name_idx'),
+        ]
 
     # Define the string representation of the Author
     def __str__(self):
@@ -96,6 +306,16 @@ class Author(models.Model):
 
 class Book(models.Model):
     """Book object"""
+    # Processing states of the uploaded image
+    IMAGE_PENDING = 'pending'
+    IMAGE_DONE = 'done'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_DONE, 'Done'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     # Define books attributes
     # To define a manytoOne relationship we use a
     # foreign key
@@ -112,6 +332,25 @@ class Book(models.Model):
     tags = models.ManyToManyField('Tag')
     # upload_to: function called when uploading image
     image = models.ImageField(null=True, upload_to=book_image_file_path)
+    image_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+    # Storage name of each thumbnail, keyed by its size (e.g. '128x128')
+    image_thumbnails = models.JSONField(default=dict, blank=True)
+    # Last time the book or its relations changed
+    updated_at = models.DateTimeField(auto_now=True)
+    # Full-text document of the title, authors and tags (Postgres only)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = BookManager()
+
+    class Meta:
+        # Listing filters on the user and orders by id
+        indexes = [
+            models.Index(fields=['user', 'id'], name='book_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
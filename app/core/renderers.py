@@ -0,0 +1,42 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# UTF-8 of the characters that are valid in JSON but not in javascript
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Render JSON with orjson when it is installed, like JSONRenderer"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON, returning a bytestring"""
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        # orjson only writes compact UTF-8, leave the other cases to json
+        if orjson is None or data is None or indent is not None or \
+                self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                # Decimals, lazy strings and the like are encoded by the
+                # encoder of JSONRenderer, and so are the datetimes to
+                # keep its format
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME |
+                orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers too large for 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict javascript subset, as JSONRenderer does
+        ret = ret.replace(LINE_SEPARATOR, b'\\u2028')
+        return ret.replace(PARAGRAPH_SEPARATOR, b'\\u2029')
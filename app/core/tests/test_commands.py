@@ -1,9 +1,17 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+
+from django.core.management import call_command, CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Tag, Author, Book
+
 
 class CommandTests(TestCase):
 
@@ -28,3 +36,158 @@ class CommandTests(TestCase):
             call_command('wait_for_db')
             # Check that the function was called 6 times
             self.assertEqual(gi.call_count, 6)
+
+    def test_benchmark_unknown(self):
+        """Test running a benchmark that does not exist fails"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'missing')
+
+
+class ImportLibraryTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _write_file(self, suffix, content):
+        """Write content to a temporary file and return its path"""
+        path = os.path.join(self.directory, f'library{suffix}')
+        with open(path, 'w') as file:
+            file.write(content)
+
+        return path
+
+    def test_import_ndjson(self):
+        """Test importing books reusing the existing tags"""
+        tag = Tag.objects.create(user=self.user, name='Gothic')
+        books = [
+            {'title': 'Dracula', 'pages': 400, 'year': 1897,
+             'price': '6.00', 'tags': ['Gothic'], 'authors': ['Bram Stoker']},
+            {'title': 'Carmilla', 'pages': 100, 'year': 1872,
+             'price': '4.00', 'tags': ['Gothic', 'Vampires'], 'authors': []},
+            {'title': 'Frankenstein', 'pages': 280, 'year': 1818,
+             'price': '5.00', 'tags': ['Gothic']},
+        ]
+        path = self._write_file(
+            '.ndjson',
+            '\n'.join(json.dumps(book) for book in books)
+        )
+
+        call_command('import_library', path, user=self.user.email,
+                     batch_size=2, stdout=StringIO())
+
+        self.assertEqual(Book.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(tag.book_set.count(), 3)
+        dracula = Book.objects.get(title='Dracula')
+        self.assertEqual(
+            list(dracula.authors.values_list('name', flat=True)),
+            ['Bram Stoker']
+        )
+
+    def test_import_csv(self):
+        """Test importing books from a CSV file"""
+        path = self._write_file(
+            '.csv',
+            'title,pages,year,price,link,tags,authors\n'
+            'Ulysses,700,1922,12.00,,Modernism|Irish,James Joyce\n'
+            'Dubliners,200,1914,7.50,,Irish,James Joyce\n'
+        )
+
+        call_command('import_library', path, user=self.user.email,
+                     stdout=StringIO())
+
+        self.assertEqual(Book.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Author.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            Book.objects.get(title='Ulysses').tags.count(),
+            2
+        )
+
+    def test_import_skips_invalid_rows(self):
+        """Test that invalid rows are reported and skipped"""
+        path = self._write_file(
+            '.ndjson',
+            json.dumps({'title': 'No pages', 'year': 2000, 'price': '1'})
+        )
+
+        call_command('import_library', path, user=self.user.email,
+                     stdout=StringIO(), stderr=StringIO())
+
+        self.assertFalse(Book.objects.exists())
+
+    def test_import_skips_malformed_lines(self):
+        """Test that lines that are not JSON objects are reported"""
+        path = self._write_file(
+            '.ndjson',
+            '\n'.join([
+                json.dumps({'title': 'First', 'pages': 100, 'year': 2000,
+                            'price': '1.00'}),
+                '{"title": "Broken",',
+                '["Not", "an", "object"]',
+                json.dumps({'title': 'Last', 'pages': 100, 'year': 2000,
+                            'price': '1.00'}),
+            ])
+        )
+        stdout = StringIO()
+        stderr = StringIO()
+
+        call_command('import_library', path, user=self.user.email,
+                     batch_size=1, stdout=stdout, stderr=stderr)
+
+        self.assertEqual(
+            sorted(Book.objects.values_list('title', flat=True)),
+            ['First', 'Last']
+        )
+        self.assertIn('line 2', stderr.getvalue())
+        self.assertIn('line 3', stderr.getvalue())
+        self.assertIn('Skipped 2 invalid rows', stdout.getvalue())
+
+    def test_import_unknown_user(self):
+        """Test importing for a user that does not exist fails"""
+        path = self._write_file('.ndjson', '')
+
+        with self.assertRaises(CommandError):
+            call_command('import_library', path, user='nobody@email.com')
+
+
+class RecountBooksTests(TestCase):
+
+    def test_recount_books(self):
+        """Test recomputing counts that went out of date"""
+        user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        tag = Tag.objects.create(user=user, name='Gothic')
+        author = Author.objects.create(user=user, name='Mary Shelley')
+        book = Book.objects.create(
+            user=user,
+            title='Frankenstein',
+            pages=280,
+            year=1818,
+            price=5.00
+        )
+        # Links inserted directly do not update the counts
+        Book.tags.through.objects.create(book=book, tag=tag)
+        Tag.objects.filter(pk=tag.pk).update(book_count=10)
+        book.authors.add(author)
+
+        out = StringIO()
+        call_command('recount_books', stdout=out)
+
+        tag.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual(tag.book_count, 1)
+        self.assertEqual(author.book_count, 1)
+        self.assertIn('1 tags and 1 authors', out.getvalue())
+
+    def test_recount_books_unknown_user(self):
+        """Test recounting the books of a missing user fails"""
+        with self.assertRaises(CommandError):
+            call_command('recount_books', user='missing@email.com')
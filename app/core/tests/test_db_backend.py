@@ -0,0 +1,120 @@
+import time
+from unittest import skipUnless
+from unittest.mock import Mock
+
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db.backends.postgresql.base import close_pools
+from core.db.backends.postgresql.pool import ConnectionPool, PoolTimeout
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_reuse_connection(self):
+        """Test a connection given back is handed out again"""
+        pool = ConnectionPool(max_size=2, timeout=1)
+        first, new = pool.get(Mock)
+        self.assertTrue(new)
+
+        pool.put(first)
+
+        self.assertEqual(pool.get(Mock), (first, False))
+
+    def test_timeout_when_full(self):
+        """Test waiting for a connection when all are in use"""
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        first, _ = pool.get(Mock)
+
+        with self.assertRaises(PoolTimeout):
+            pool.get(Mock)
+        pool.discard(first)
+        first.close.assert_called_once()
+        self.assertTrue(pool.get(Mock)[1])
+
+    def test_failed_connect(self):
+        """Test a connection that failed to open frees its place"""
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+
+        with self.assertRaises(ValueError):
+            pool.get(Mock(side_effect=ValueError))
+        self.assertTrue(pool.get(Mock)[1])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+class DatabaseWrapperTests(TestCase):
+    """Test the health checks and pool of the PostgreSQL backend"""
+
+    def wrapper(self, **settings):
+        """Return a connection to the test database with the settings"""
+        wrapper = connection.copy()
+        wrapper.settings_dict.update(settings)
+        self.addCleanup(close_pools)
+        self.addCleanup(wrapper.close)
+
+        return wrapper
+
+    def backend_pid(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def terminate(self, pid):
+        """End the server process of a connection and wait for it"""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+            for _ in range(100):
+                cursor.execute(
+                    'SELECT 1 FROM pg_stat_activity WHERE pid = %s',
+                    [pid]
+                )
+                if cursor.fetchone() is None:
+                    return
+                time.sleep(0.01)
+
+    def test_health_check_reconnects(self):
+        """Test a broken connection is replaced in the next request"""
+        wrapper = self.wrapper(CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=True)
+        pid = self.backend_pid(wrapper)
+        self.terminate(pid)
+
+        # Done by Django as a request starts
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertNotEqual(self.backend_pid(wrapper), pid)
+
+    def test_no_health_check(self):
+        """Test a broken connection fails without health checks"""
+        wrapper = self.wrapper(CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=False)
+        self.terminate(self.backend_pid(wrapper))
+
+        wrapper.close_if_unusable_or_obsolete()
+
+        with self.assertRaises(DatabaseError):
+            self.backend_pid(wrapper)
+
+    def test_pool_reuses_connection(self):
+        """Test a closed connection goes back to the pool"""
+        wrapper = self.wrapper(
+            CONN_MAX_AGE=0,
+            POOL={'MAX_SIZE': 2, 'TIMEOUT': 1}
+        )
+        pid = self.backend_pid(wrapper)
+
+        wrapper.close()
+
+        self.assertIsNone(wrapper.connection)
+        self.assertEqual(self.backend_pid(wrapper), pid)
+
+    def test_pool_replaces_broken_connection(self):
+        """Test a pooled connection broken while idle is not handed out"""
+        wrapper = self.wrapper(
+            CONN_MAX_AGE=0,
+            CONN_HEALTH_CHECKS=True,
+            POOL={'MAX_SIZE': 2, 'TIMEOUT': 1}
+        )
+        pid = self.backend_pid(wrapper)
+        wrapper.close()
+        self.terminate(pid)
+
+        self.assertNotEqual(self.backend_pid(wrapper), pid)
@@ -0,0 +1,128 @@
+from importlib.util import find_spec
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.checks import run_checks
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+TOKEN_URL = reverse('user:token')
+PBKDF2 = 'core.hashers.PBKDF2PasswordHasher'
+MD5 = 'django.contrib.auth.hashers.MD5PasswordHasher'
+
+
+def hashing(**costs):
+    """Return the password hashing settings with the given costs"""
+    return dict(settings.PASSWORD_HASHING, **costs)
+
+
+class HasherTests(SimpleTestCase):
+    """Test the hashers take their cost from the settings"""
+
+    def test_tests_use_fast_hasher(self):
+        """Test the test suite hashes the passwords with MD5"""
+        self.assertEqual(get_hasher().algorithm, 'md5')
+
+    @override_settings(
+        PASSWORD_HASHERS=[PBKDF2],
+        PASSWORD_HASHING=hashing(PBKDF2_ITERATIONS=1000)
+    )
+    def test_pbkdf2_iterations(self):
+        """Test the PBKDF2 iterations come from the settings"""
+        encoded = make_password('testpass')
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+        with self.settings(PASSWORD_HASHING=hashing(PBKDF2_ITERATIONS=2000)):
+            self.assertTrue(get_hasher().must_update(encoded))
+
+    @skipUnless(find_spec('argon2'), 'argon2-cffi is not installed')
+    @override_settings(
+        PASSWORD_HASHERS=['core.hashers.Argon2PasswordHasher'],
+        PASSWORD_HASHING=hashing(
+            ARGON2_TIME_COST=1,
+            ARGON2_MEMORY_COST=1024,
+            ARGON2_PARALLELISM=1
+        )
+    )
+    def test_argon2_costs(self):
+        """Test the Argon2 costs come from the settings"""
+        encoded = make_password('testpass')
+
+        self.assertIn('$m=1024,t=1,p=1$', encoded)
+        self.assertFalse(get_hasher().must_update(encoded))
+
+    @skipUnless(find_spec('bcrypt'), 'bcrypt is not installed')
+    @override_settings(
+        PASSWORD_HASHERS=['core.hashers.BCryptSHA256PasswordHasher'],
+        PASSWORD_HASHING=hashing(BCRYPT_ROUNDS=4)
+    )
+    def test_bcrypt_rounds(self):
+        """Test the bcrypt rounds come from the settings"""
+        encoded = make_password('testpass')
+
+        self.assertTrue(encoded.startswith('bcrypt_sha256$$2b$04$'))
+
+    @override_settings(PASSWORD_HASHERS=[MD5, PBKDF2])
+    def test_md5_deploy_warning(self):
+        """Test the deploy checks warn about the MD5 hasher"""
+        ids = [
+            message.id
+            for message in run_checks(include_deployment_checks=True)
+        ]
+
+        self.assertIn('core.W001', ids)
+
+
+class RehashOnLoginTests(TestCase):
+    """Test the passwords are hashed again when a token is issued"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {'email': 'test@email.com', 'password': 'testpass'}
+
+    def create_user(self):
+        return get_user_model().objects.create_user(**self.payload)
+
+    def test_rehash_other_hasher(self):
+        """Test a hash of another hasher is replaced on login"""
+        user = self.create_user()
+        with self.settings(PASSWORD_HASHERS=[PBKDF2, MD5]):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+            user.refresh_from_db()
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+            self.assertTrue(user.check_password(self.payload['password']))
+
+    @override_settings(
+        PASSWORD_HASHERS=[PBKDF2],
+        PASSWORD_HASHING=hashing(PBKDF2_ITERATIONS=1000)
+    )
+    def test_rehash_other_cost(self):
+        """Test a hash of another cost is replaced on login"""
+        user = self.create_user()
+        with self.settings(PASSWORD_HASHING=hashing(PBKDF2_ITERATIONS=2000)):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        user.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_no_rehash_wrong_password(self):
+        """Test a failed login leaves the hash as it is"""
+        user = self.create_user()
+        with self.settings(PASSWORD_HASHERS=[PBKDF2, MD5]):
+            res = self.client.post(
+                TOKEN_URL,
+                {'email': self.payload['email'], 'password': 'wrong'}
+            )
+
+        user.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(user.password.startswith('md5$'))
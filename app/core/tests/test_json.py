@@ -0,0 +1,102 @@
+import datetime
+import decimal
+import io
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+# Payload with every type the framework encoder knows about
+PAYLOAD = {
+    'id': 1,
+    'title': 'Cien años de soledad \u2028\u2029',
+    'price': decimal.Decimal('12.50'),
+    'updated_at': datetime.datetime(
+        2021, 5, 4, 10, 30, 15, 123456, tzinfo=datetime.timezone.utc
+    ),
+    'published': datetime.date(1967, 5, 30),
+    'key': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'status': gettext_lazy('Pending'),
+    'tags': [1, 2, 3],
+    'ratio': 0.5,
+    'link': None,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer writes what JSONRenderer writes"""
+
+    def test_same_output(self):
+        """Test the rendered bytes are the ones of JSONRenderer"""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD)
+        )
+
+    def test_indent_falls_back(self):
+        """Test that an indented response is rendered by JSONRenderer"""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type)
+        )
+
+    def test_large_integer_falls_back(self):
+        """Test rendering integers orjson cannot encode"""
+        data = {'id': 2 ** 70}
+
+        self.assertEqual(FastJSONRenderer().render(data), b'{"id":%d}' % (
+            2 ** 70
+        ))
+
+    @patch('core.renderers.orjson', None)
+    def test_without_orjson(self):
+        """Test that the renderer works when orjson is not installed"""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD)
+        )
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the orjson parser reads what JSONParser reads"""
+
+    def test_same_data(self):
+        """Test the parsed data is the one of JSONParser"""
+        body = '{"title": "Cien años", "tags": [1, 2], "price": 1.5}'.encode()
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_invalid_json(self):
+        """Test that invalid JSON is a parse error"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_nan_rejected(self):
+        """Test that NaN is rejected as the strict JSONParser does"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"price": NaN}'))
+
+    def test_other_encoding_falls_back(self):
+        """Test parsing a body that is not UTF-8"""
+        body = '{"title": "Cien años"}'.encode('latin-1')
+
+        data = FastJSONParser().parse(
+            io.BytesIO(body),
+            parser_context={'encoding': 'latin-1'}
+        )
+
+        self.assertEqual(data, {'title': 'Cien años'})
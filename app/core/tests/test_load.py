@@ -0,0 +1,62 @@
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Tag, Book
+
+from benchmarks import load
+from benchmarks.seed import seed_library
+
+
+class LoadSummaryTests(SimpleTestCase):
+
+    def test_percentile(self):
+        """Test the nearest-rank percentiles"""
+        values = list(range(1, 101))
+
+        self.assertEqual(load.percentile(values, 0.5), 50)
+        self.assertEqual(load.percentile(values, 0.99), 99)
+        self.assertEqual(load.percentile([], 0.5), 0)
+
+    def test_summarize(self):
+        """Test summarizing the samples of a scenario"""
+        samples = [(10, 2, 200), (30, 4, 200), (20, None, 500)]
+
+        summary = load.summarize(samples, 0.5)
+
+        self.assertEqual(summary['requests'], 3)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['p50_ms'], 20)
+        self.assertEqual(summary['queries_per_request'], 3)
+        self.assertEqual(summary['requests_per_second'], 6)
+
+
+class LoadTests(TestCase):
+
+    def test_seed_library(self):
+        """Test seeding users with linked books"""
+        users = seed_library(2, 10, tags=5, authors=3)
+
+        self.assertEqual(len(users), 2)
+        for user in users:
+            self.assertEqual(Book.objects.filter(user=user).count(), 10)
+            self.assertFalse(
+                Book.objects.filter(user=user, tags__isnull=True).exists()
+            )
+            self.assertTrue(user.token.key)
+        # The counts are maintained by the bulk insert
+        self.assertEqual(
+            sum(Tag.objects.values_list('book_count', flat=True)),
+            Book.tags.through.objects.count()
+        )
+
+    def test_run_client(self):
+        """Test every scenario succeeds through the APIClient"""
+        users = load.prepare(seed_library(1, 5, tags=3, authors=2))
+
+        results = load.run_client(users, 2)
+
+        self.assertEqual(set(results), {s.name for s in load.SCENARIOS})
+        self.assertEqual(load.totals(results)['errors'], 0)
+        self.assertEqual(
+            load.totals(results)['requests'],
+            2 * len(load.SCENARIOS)
+        )
@@ -0,0 +1,145 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+
+
+BOOKS_URL = reverse('book:book-list')
+METRICS_URL = reverse('core:metrics')
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_percentiles(self):
+        """Test the percentiles are read from the buckets"""
+        histogram = metrics.Histogram((10, 100, 1000))
+        for value in [5] * 90 + [50] * 9 + [700]:
+            histogram.add(value)
+
+        summary = histogram.summary()
+
+        self.assertEqual(summary['count'], 100)
+        self.assertEqual(summary['p50'], 10)
+        self.assertEqual(summary['p95'], 100)
+        # Bounded by the largest value seen
+        self.assertEqual(summary['p99'], 100)
+        self.assertEqual(histogram.percentile(1), 700)
+
+    def test_merge(self):
+        """Test adding the values of another histogram"""
+        histogram1 = metrics.Histogram((10, 100))
+        histogram1.add(5)
+        histogram2 = metrics.Histogram.from_dict(histogram1.to_dict())
+        histogram2.add(500)
+
+        histogram1.merge(histogram2)
+
+        self.assertEqual(histogram1.counts, [2, 0, 1])
+        self.assertEqual(histogram1.maximum, 500)
+        self.assertEqual(histogram1.total, 510)
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """Test that the measures of the request are sent"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(BOOKS_URL)
+
+        timing = res['Server-Timing']
+        for name in ('total', 'db', 'view', 'render'):
+            self.assertIn(f'{name};dur=', timing)
+        self.assertIn(f'queries;desc="{len(context)}"', timing)
+
+    def test_requests_counted_per_view(self):
+        """Test that each request is counted in the histograms of its view"""
+        self.client.get(BOOKS_URL)
+        self.client.get(BOOKS_URL)
+
+        views = metrics.collect()
+
+        self.assertEqual(views['book:book-list']['total']['count'], 2)
+        self.assertGreaterEqual(views['book:book-list']['queries']['max'], 1)
+
+    def test_not_found_not_counted(self):
+        """Test that URLs without a view are not counted"""
+        self.client.get('/api/missing/')
+
+        self.assertEqual(metrics.collect(), {})
+
+    def test_metrics_staff_only(self):
+        """Test that only staff users can read the measures"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_endpoint(self):
+        """Test reading and resetting the measures as a staff user"""
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(BOOKS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['book:book-list']['total']['count'], 1)
+        self.client.delete(METRICS_URL)
+        self.assertNotIn('book:book-list', metrics.collect())
+
+    def test_expired_processes_dropped(self):
+        """Test the measures of processes that stopped publishing go"""
+        self.client.get(BOOKS_URL)
+        cache = metrics._cache()
+        stopped = 'request-metrics:stopped:1'
+        cache.set(metrics.INDEX_KEY, [stopped], None)
+
+        views = metrics.collect()
+
+        self.assertEqual(views['book:book-list']['total']['count'], 1)
+        self.assertEqual(cache.get(metrics.INDEX_KEY), [metrics.PROCESS_KEY])
+
+    def test_published_measures_expire(self):
+        """Test the measures of a process expire after its TTL"""
+        self.client.get(BOOKS_URL)
+
+        with override_settings(REQUEST_METRICS=dict(
+            settings.REQUEST_METRICS,
+            PROCESS_TTL=60
+        )), patch.object(metrics, '_cache') as mock_cache:
+            mock_cache.return_value.get.return_value = []
+            metrics.registry.publish()
+
+        process_set = mock_cache.return_value.set.call_args_list[0]
+        self.assertEqual(process_set[0][0], metrics.PROCESS_KEY)
+        self.assertEqual(process_set[0][2], 60)
+
+    def test_request_metrics_command(self):
+        """Test showing the measures from the command line"""
+        self.client.get(BOOKS_URL)
+
+        out = StringIO()
+        call_command('request_metrics', '--json', stdout=out)
+
+        views = json.loads(out.getvalue())
+        self.assertEqual(views['book:book-list']['total']['count'], 1)
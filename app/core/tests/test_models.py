@@ -94,3 +94,35 @@ class ModelTests(TestCase):
         exp_path = f'uploads/book/{uuid}.jpg'
         # Check that the path match
         self.assertEqual(file_path, exp_path)
+
+    def test_book_related_values(self):
+        """Test reading the related values of books from the links"""
+        user = sample_user()
+        book = models.Book.objects.create(
+            user=user,
+            title='Dune',
+            pages=600,
+            year=1965,
+            price=9.99,
+        )
+        other = models.Book.objects.create(
+            user=user,
+            title='Emma',
+            pages=400,
+            year=1815,
+            price=5.99,
+        )
+        second = models.Tag.objects.create(user=user, name='Second')
+        first = models.Tag.objects.create(user=user, name='First')
+        book.tags.add(second)
+        book.tags.add(first)
+        other.tags.add(first)
+
+        names = models.Book.objects.related_values(
+            models.Book.tags.field,
+            'name',
+            ordering=('id',),
+            id__in=[book.id]
+        )
+
+        self.assertEqual(names, {book.id: ['Second', 'First']})
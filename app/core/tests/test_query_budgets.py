@@ -0,0 +1,357 @@
+"""Query budgets of every route of the book and user APIs
+
+Every route is requested with a small and a large library of books.
+A request fails the test when its number of queries grows with the
+library, or goes over the budget of its route in query_budgets.json.
+Routes without a budget, or without a request below, fail as well.
+"""
+import io
+import json
+import shutil
+import tempfile
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Tag, Author, Book
+
+from user.authentication import reset_token_cache
+
+
+BUDGETS_PATH = Path(__file__).with_name('query_budgets.json')
+# Version of the layout of the budgets file read by this module
+BUDGETS_VERSION = 1
+URLCONFS = ('book.urls', 'user.urls')
+# Number of books, tags and authors of the small and the large library
+SIZES = (3, 12)
+PASSWORD = 'testpass'
+# Methods every view answers without touching the database
+IGNORED_METHODS = ('head', 'options')
+
+
+def load_budgets(path=BUDGETS_PATH):
+    """Return the query budget of each method of each route"""
+    with open(path) as file:
+        data = json.load(file)
+    if data.get('version') != BUDGETS_VERSION:
+        raise ValueError(
+            f'{path} has version {data.get("version")}, '
+            f'expected {BUDGETS_VERSION}'
+        )
+
+    return data['budgets']
+
+
+def route_methods(urlconf):
+    """Return the HTTP methods of every named route of a urlconf"""
+    module = import_module(urlconf)
+    routes = {}
+    _collect_routes(module.urlpatterns, module.app_name, routes)
+
+    return routes
+
+
+def _collect_routes(patterns, namespace, routes):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            _collect_routes(pattern.url_patterns, namespace, routes)
+            continue
+        # Viewsets map the methods of the route to their actions
+        methods = getattr(pattern.callback, 'actions', None)
+        if methods is None:
+            view = pattern.callback.view_class
+            methods = [
+                method for method in view.http_method_names
+                if hasattr(view, method)
+            ]
+        # Format suffix patterns share the name of the route
+        routes.setdefault(f'{namespace}:{pattern.name}', set()).update(
+            method.upper() for method in methods
+            if method not in IGNORED_METHODS
+        )
+
+
+class Library:
+    """User owning as many books, tags and authors as the size"""
+
+    def __init__(self, size):
+        self.user = get_user_model().objects.create_user(
+            f'library{size}@email.com',
+            PASSWORD
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(size)
+        ]
+        self.authors = [
+            Author.objects.create(user=self.user, name=f'Author {i}')
+            for i in range(size)
+        ]
+        self.books = []
+        for i in range(size):
+            book = Book.objects.create(
+                user=self.user,
+                title=f'Book {i}',
+                pages=100 + i,
+                year=2000 + i,
+                price=i + 0.5,
+                link=f'https://books.com/{i}'
+            )
+            # Two links each so the relations have rows to fetch
+            book.tags.add(self.tags[i], self.tags[(i + 1) % size])
+            book.authors.add(self.authors[i], self.authors[(i + 1) % size])
+            self.books.append(book)
+
+
+def _image():
+    """Return a small JPEG image to upload"""
+    file = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(file, format='JPEG')
+    file.name = 'image.jpg'
+    file.seek(0)
+
+    return file
+
+
+def _new_book(library):
+    return {
+        'title': 'New book',
+        'pages': 300,
+        'year': 1990,
+        'price': '9.99',
+        # The same links in every library, so that only the rows grow,
+        # replacing one of the links of the first book
+        'tags': [tag.id for tag in library.tags[1:3]],
+        'authors': [author.id for author in library.authors[1:3]],
+    }
+
+
+class Request:
+    """Request to a route, built from the data of a library
+
+    The arguments, parameters and data may be callables given the
+    library.
+    """
+
+    def __init__(self, args=None, data=None, format='json', auth=True):
+        self.args = args
+        self.data = data
+        self.format = format
+        self.auth = auth
+
+    def _value(self, value, library):
+        return value(library) if callable(value) else value
+
+    def send(self, client, route, method, library):
+        """Send the request as the user of the library"""
+        path = reverse(route, args=self._value(self.args, library))
+        client.credentials(**(
+            {'HTTP_AUTHORIZATION': f'Token {library.token.key}'}
+            if self.auth else {}
+        ))
+        data = self._value(self.data, library)
+        if method == 'GET':
+            return client.get(path, data)
+
+        return getattr(client, method.lower())(path, data, format=self.format)
+
+
+def _first_book(library):
+    return [library.books[0].id]
+
+
+# Requests of each method of each route, several when the route has
+# paths worth checking on their own, e.g. the sparse fieldsets
+REQUESTS = {
+    'book:api-root': {'GET': [Request()]},
+    'book:tag-list': {
+        'GET': [
+            Request(),
+            Request(data={'assigned_only': 1}),
+            Request(data={'prefix': 'Ta'}),
+        ],
+        'POST': [Request(data={'name': 'New tag'})],
+    },
+    'book:author-list': {
+        'GET': [
+            Request(),
+            Request(data={'assigned_only': 1}),
+            Request(data={'contains': 'thor'}),
+        ],
+        'POST': [Request(data={'name': 'New author'})],
+    },
+    'book:book-list': {
+        'GET': [
+            Request(),
+            Request(data={'page_size': 5}),
+            Request(data={'fields': 'id,title,tags'}),
+            Request(data={'layout': 'columnar'}),
+            Request(data={'q': 'book'}),
+            Request(data=lambda library: {
+                'tags': ','.join(str(tag.id) for tag in library.tags[:2]),
+                'match': 'all',
+            }),
+            Request(data={'year__gte': 2000, 'ordering': '-price'}),
+        ],
+        'POST': [Request(data=_new_book)],
+    },
+    'book:book-detail': {
+        'GET': [Request(args=_first_book)],
+        'PUT': [Request(args=_first_book, data=_new_book)],
+        'PATCH': [Request(args=_first_book, data={'title': 'New title'})],
+        'DELETE': [Request(args=_first_book)],
+    },
+    'book:book-upload-image': {
+        'POST': [Request(
+            args=_first_book,
+            data=lambda library: {'image': _image()},
+            format='multipart'
+        )],
+    },
+    'book:book-bulk': {
+        'POST': [Request(data=lambda library: [_new_book(library)] * 3)],
+        'PUT': [Request(data=lambda library: [
+            dict(_new_book(library), id=book.id)
+            for book in library.books[:3]
+        ])],
+    },
+    'book:book-export': {
+        'GET': [Request(), Request(data={'type': 'csv'})],
+    },
+    'book:book-stats': {
+        'GET': [
+            Request(data={'group_by': 'year'}),
+            Request(data={'group_by': 'tag'}),
+            Request(data={'group_by': 'author'}),
+        ],
+    },
+    'user:create': {
+        'POST': [Request(
+            data={
+                'email': 'new@email.com',
+                'password': PASSWORD,
+                'name': 'New user',
+            },
+            auth=False
+        )],
+    },
+    'user:token': {
+        'POST': [Request(
+            data=lambda library: {
+                'email': library.user.email,
+                'password': PASSWORD,
+            },
+            auth=False
+        )],
+    },
+    'user:me': {
+        'GET': [Request()],
+        'PUT': [Request(data=lambda library: {
+            'email': library.user.email,
+            'password': PASSWORD,
+            'name': 'New name',
+        })],
+        'PATCH': [Request(data={'name': 'New name'})],
+    },
+}
+
+
+class QueryBudgetTests(TestCase):
+    """Test the queries of every route stay within their budget"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Uploaded images are written to a directory removed afterwards
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.budgets = load_budgets()
+        self.routes = {}
+        for urlconf in URLCONFS:
+            self.routes.update(route_methods(urlconf))
+
+    def count_queries(self, route, method, request, library):
+        """Return the queries of a request run on cold caches"""
+        caches[settings.BOOK_CACHE_ALIAS].clear()
+        reset_token_cache()
+        # Roll the request back so every request sees the same library
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as context:
+                res = request.send(self.client, route, method, library)
+                # Streamed responses query while they are consumed
+                if res.streaming:
+                    b''.join(res.streaming_content)
+            transaction.set_rollback(True)
+        self.assertLess(
+            res.status_code,
+            400,
+            f'{method} {route} answered {res.status_code}'
+        )
+
+        return len(context)
+
+    def test_every_route_has_a_budget(self):
+        """Test the budgets and requests cover exactly the routes"""
+        for route, methods in self.routes.items():
+            for method in methods:
+                with self.subTest(route=route, method=method):
+                    self.assertIn(method, self.budgets.get(route, {}))
+                    self.assertIn(method, REQUESTS.get(route, {}))
+        # Budgets of removed routes are stale
+        for route, budgets in self.budgets.items():
+            self.assertLessEqual(set(budgets), self.routes.get(route, set()))
+
+    def test_queries_within_budget(self):
+        """Test the queries do not grow with the library nor the budget"""
+        libraries = [Library(size) for size in SIZES]
+        for route, methods in sorted(REQUESTS.items()):
+            for method, requests in sorted(methods.items()):
+                budget = self.budgets[route][method]
+                for index, request in enumerate(requests):
+                    with self.subTest(route=route, method=method, n=index):
+                        # Fill what the process looks up once, e.g.
+                        # the database extensions of the searches
+                        self.count_queries(
+                            route,
+                            method,
+                            request,
+                            libraries[0]
+                        )
+                        small, large = [
+                            self.count_queries(route, method, request, lib)
+                            for lib in libraries
+                        ]
+                        self.assertEqual(
+                            small,
+                            large,
+                            f'{method} {route} made {small} queries with '
+                            f'{SIZES[0]} books and {large} with {SIZES[1]}'
+                        )
+                        self.assertLessEqual(
+                            large,
+                            budget,
+                            f'{method} {route} made {large} queries, '
+                            f'over its budget of {budget}'
+                        )
@@ -0,0 +1,27 @@
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics
+
+from user.authentication import CachedTokenAuthentication
+
+
+class RequestMetricsView(APIView):
+    """Show the request measures of each view, for staff users"""
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SessionAuthentication,
+    )
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        """Return the summary of the measures of each view"""
+        return Response(metrics.collect())
+
+    def delete(self, request):
+        """Start counting the measures again"""
+        metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,192 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+# Fields of the user kept by the token caches. The user is rebuilt with
+# the others deferred: the password hash is never cached and a save
+# only writes the cached fields
+USER_FIELDS = ('id', 'email', 'name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def dump_entry(entry):
+    """Return the cached data of a (user, token) entry"""
+    user, token = entry
+
+    return {name: getattr(user, name) for name in USER_FIELDS}, token.created
+
+
+def load_entry(key, data):
+    """Return the (user, token) entry of the cached data of a token key"""
+    user_values, created = data
+    model = get_user_model()
+    # from_db takes the values in the order of the model fields
+    names = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in user_values
+    ]
+    user = model.from_db(
+        router.db_for_read(model),
+        names,
+        [user_values[name] for name in names]
+    )
+    token = Token.from_db(
+        router.db_for_read(Token),
+        ('key', 'user_id', 'created'),
+        (key, user.pk, created)
+    )
+    token.user = user
+
+    return user, token
+
+
+class LocalTokenCache:
+    """Bounded LRU of token key to (user, token) entries with a TTL
+
+    The entries of a process are only removed by the changes made in that
+    process: the other processes keep authenticating a deleted token or a
+    deactivated user until their entry expires, up to the TTL.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the entry of the key, None if missing or expired"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, entry = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            # Mark the entry as the most recently used
+            self._entries.move_to_end(key)
+
+        return load_entry(key, entry)
+
+    def set(self, key, entry):
+        """Store the entry, evicting the least recently used one"""
+        entry = dump_entry(entry)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove the entry of the key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_pk):
+        """Remove the entries of a user"""
+        with self._lock:
+            for key, (_, (user_values, _)) in list(self._entries.items()):
+                if user_values['id'] == user_pk:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedTokenCache:
+    """Token entries stored in a Django cache shared by the processes"""
+
+    def __init__(self, alias, ttl):
+        self.alias = alias
+        self.ttl = ttl
+
+    def _key(self, key):
+        # Never write the token itself into the cache keys
+        return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        data = caches[self.alias].get(self._key(key))
+        if data is None:
+            return None
+
+        return load_entry(key, data)
+
+    def set(self, key, entry):
+        caches[self.alias].set(self._key(key), dump_entry(entry), self.ttl)
+
+    def delete(self, key):
+        caches[self.alias].delete(self._key(key))
+
+    def delete_user(self, user_pk):
+        # The entries are found from the tokens of the user
+        self._delete_tokens(Token.objects.filter(user_id=user_pk))
+
+    def clear(self):
+        # Other entries of the cache are kept, only the tokens go
+        self._delete_tokens(Token.objects.all())
+
+    def _delete_tokens(self, tokens, batch_size=1000):
+        keys = tokens.values_list('key', flat=True).iterator()
+        while True:
+            batch = [self._key(key) for key in islice(keys, batch_size)]
+            if not batch:
+                break
+            caches[self.alias].delete_many(batch)
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Return the token cache configured in the settings"""
+    global _token_cache
+    with _token_cache_lock:
+        if _token_cache is None:
+            config = settings.TOKEN_AUTH_CACHE
+            if config['CACHE_ALIAS']:
+                _token_cache = SharedTokenCache(
+                    config['CACHE_ALIAS'],
+                    config['TTL']
+                )
+            else:
+                _token_cache = LocalTokenCache(
+                    config['MAX_SIZE'],
+                    config['TTL']
+                )
+
+    return _token_cache
+
+
+def reset_token_cache():
+    """Forget the token cache so it is built again from the settings"""
+    global _token_cache
+    with _token_cache_lock:
+        _token_cache = None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that remembers the users of recent tokens"""
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        entry = token_cache.get(key)
+        if entry is None:
+            # Invalid tokens and inactive users raise here as usual
+            entry = super().authenticate_credentials(key)
+            token_cache.set(key, entry)
+
+        # A cached entry is rebuilt for each request, never shared
+        return entry
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import get_token_cache
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    """Stop authenticating a deleted token from the cache"""
+    get_token_cache().delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_user(sender, instance, created, **kwargs):
+    """Reload a changed user, e.g. deactivated, on the next request"""
+    if not created:
+        get_token_cache().delete_user(instance.pk)
@@ -0,0 +1,195 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import LocalTokenCache, SharedTokenCache, \
+    reset_token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating requests through the token cache"""
+
+    def setUp(self):
+        reset_token_cache()
+        self.addCleanup(reset_token_cache)
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'testpass',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_skips_query(self):
+        """Test that a known token is authenticated without queries"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test that a deleted token stops authenticating"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test that a deactivated user stops authenticating"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_reloaded(self):
+        """Test that the cached user reflects updates"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    def test_update_keeps_changes_of_other_processes(self):
+        """Test an update does not write the cached fields back"""
+        self.client.get(ME_URL)
+        # Changed by another process, whose changes leave the cache of
+        # this one as it was
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False,
+            password='changed'
+        )
+
+        self.client.patch(ME_URL, {'name': 'New name'})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New name')
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.user.password, 'changed')
+
+    @override_settings(TOKEN_AUTH_CACHE={
+        'MAX_SIZE': 10,
+        'TTL': 60,
+        'CACHE_ALIAS': 'default',
+    })
+    def test_shared_cache(self):
+        """Test authenticating through the shared cache backend"""
+        reset_token_cache()
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE={
+        'MAX_SIZE': 10,
+        'TTL': 60,
+        'CACHE_ALIAS': 'default',
+    })
+    def test_shared_cache_without_password(self):
+        """Test the shared cache does not store the password hash"""
+        reset_token_cache()
+        self.client.get(ME_URL)
+
+        entry = caches['default'].get(SharedTokenCache('default', 60)._key(
+            self.token.key
+        ))
+        self.assertNotIn(self.user.password, str(entry))
+        # The user is saved without writing the fields left out
+        res = self.client.patch(ME_URL, {'name': 'New name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New name')
+        self.assertTrue(self.user.check_password('testpass'))
+
+    def test_shared_cache_clear(self):
+        """Test clearing the shared cache keeps the other entries"""
+        token_cache = SharedTokenCache('default', 60)
+        token_cache.set(self.token.key, (self.user, self.token))
+        caches['default'].set('other', 1)
+        self.addCleanup(caches['default'].delete, 'other')
+
+        token_cache.clear()
+
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(caches['default'].get('other'), 1)
+
+
+class LocalTokenCacheTests(TestCase):
+    """Test the in-process LRU of tokens"""
+
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user(
+                f'user{i}@email.com',
+                'testpass'
+            )
+            for i in range(3)
+        ]
+
+    def entry(self, index):
+        user = self.users[index]
+
+        return user, Token(key=str(index), user=user)
+
+    def cached_user_id(self, cache, key):
+        entry = cache.get(key)
+
+        return None if entry is None else entry[0].id
+
+    def test_least_recently_used_evicted(self):
+        """Test that the least recently used entry is evicted"""
+        cache = LocalTokenCache(max_size=2, ttl=60)
+        cache.set('a', self.entry(0))
+        cache.set('b', self.entry(1))
+        cache.get('a')
+
+        cache.set('c', self.entry(2))
+
+        self.assertEqual(self.cached_user_id(cache, 'a'), self.users[0].id)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(self.cached_user_id(cache, 'c'), self.users[2].id)
+
+    @patch('user.authentication.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        """Test that entries are dropped after their TTL"""
+        cache = LocalTokenCache(max_size=2, ttl=60)
+        mock_monotonic.return_value = 100
+        cache.set('a', self.entry(0))
+
+        mock_monotonic.return_value = 161
+
+        self.assertIsNone(cache.get('a'))
+
+    def test_entries_without_password(self):
+        """Test the local cache does not keep the password hash"""
+        cache = LocalTokenCache(max_size=2, ttl=60)
+        cache.set('a', self.entry(0))
+
+        user, token = cache.get('a')
+
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertNotIn(self.users[0].password, str(cache._entries))
+        self.assertEqual(token.user_id, self.users[0].id)
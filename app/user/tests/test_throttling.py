@@ -0,0 +1,190 @@
+import base64
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+
+from user import serializers
+from user.throttling import LocalBucketStore, SharedBucketStore, \
+    reset_bucket_store, take_token
+
+
+TOKEN_URL = reverse('user:token')
+
+
+def throttle(email=(2, 60), ip=(4, 60), enabled=True):
+    """Return throttle settings with the (capacity, per minute) of the
+    email and IP buckets"""
+    return dict(
+        settings.TOKEN_THROTTLE,
+        ENABLED=enabled,
+        RATES={
+            'email': {'CAPACITY': email[0], 'PER_MINUTE': email[1]},
+            'ip': {'CAPACITY': ip[0], 'PER_MINUTE': ip[1]},
+        }
+    )
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_take_until_empty(self):
+        """Test a bucket gives its capacity, then the time to wait"""
+        bucket = None
+        for _ in range(3):
+            bucket, wait = take_token(bucket, 100, 3, 0.5)
+            self.assertEqual(wait, 0)
+
+        bucket, wait = take_token(bucket, 100, 3, 0.5)
+
+        self.assertEqual(wait, 2)
+
+    def test_refill(self):
+        """Test a bucket is refilled with time, up to its capacity"""
+        bucket, _ = take_token((0, 100), 100, 3, 0.5)
+
+        bucket, wait = take_token(bucket, 102, 3, 0.5)
+        self.assertEqual(wait, 0)
+        bucket, wait = take_token(bucket, 1000, 3, 0.5)
+        self.assertEqual(bucket[0], 2)
+
+    def test_local_store_evicts(self):
+        """Test the local store keeps the most recently used buckets"""
+        store = LocalBucketStore(max_size=2)
+        for key in ('a', 'b', 'a', 'c'):
+            store.take(key, 1, 1)
+
+        self.assertEqual(list(store._buckets), ['a', 'c'])
+
+    def test_shared_store(self):
+        """Test the shared store keeps the buckets in the cache"""
+        store = SharedBucketStore('default')
+        self.addCleanup(store.clear)
+
+        self.assertEqual(store.take('key', 1, 0.1), 0)
+        self.assertGreater(store.take('key', 1, 0.1), 0)
+        self.assertEqual(SharedBucketStore('default').take('other', 1, 1), 0)
+
+    def test_shared_store_clear(self):
+        """Test clearing the shared store keeps the other cached data"""
+        cache = caches['default']
+        store = SharedBucketStore('default')
+        self.addCleanup(store.clear)
+        cache.set('other', 'value')
+        self.addCleanup(cache.delete, 'other')
+        store.take('key', 1, 0.1)
+
+        store.clear()
+
+        self.assertEqual(store.take('key', 1, 0.1), 0)
+        self.assertEqual(cache.get('other'), 'value')
+
+
+class TokenThrottleApiTests(TestCase):
+    """Test throttling the token requests"""
+
+    def setUp(self):
+        reset_bucket_store()
+        self.addCleanup(reset_bucket_store)
+        metrics.reset()
+        self.client = APIClient()
+        self.payload = {'email': 'test@email.com', 'password': 'testpass'}
+        get_user_model().objects.create_user(**self.payload)
+
+    def post(self, email='test@email.com', password='testpass'):
+        return self.client.post(
+            TOKEN_URL,
+            {'email': email, 'password': password}
+        )
+
+    @override_settings(TOKEN_THROTTLE=throttle())
+    def test_throttle_email(self):
+        """Test the attempts on an email are limited before hashing"""
+        self.assertEqual(self.post().status_code, status.HTTP_200_OK)
+        self.post(password='wrong')
+
+        with patch.object(
+            serializers,
+            'authenticate',
+            wraps=serializers.authenticate
+        ) as mock_authenticate:
+            res = self.post()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        mock_authenticate.assert_not_called()
+        # The same email in other cases shares the bucket
+        res = self.post(email='TEST@email.com')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(TOKEN_THROTTLE=throttle(email=(10, 60), ip=(3, 60)))
+    def test_throttle_ip(self):
+        """Test the attempts of a client IP are limited, whatever the email"""
+        for i in range(3):
+            self.post(email=f'user{i}@email.com')
+
+        res = self.post()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = self.client.post(
+            TOKEN_URL,
+            self.payload,
+            REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(TOKEN_THROTTLE=throttle(email=(10, 60), ip=(2, 60)))
+    def test_throttle_ip_ignores_forwarded_for(self):
+        """Test a client can't get a new IP bucket by sending the header"""
+        for i in range(3):
+            res = self.client.post(
+                TOKEN_URL,
+                self.payload,
+                HTTP_X_FORWARDED_FOR=f'10.0.1.{i}'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(TOKEN_THROTTLE=throttle(ip=(2, 60)))
+    def test_basic_auth_not_hashed(self):
+        """Test a Basic Authorization header hashes no password before the
+        throttles"""
+        credentials = base64.b64encode(b'test@email.com:testpass').decode()
+
+        with patch(
+            'django.contrib.auth.base_user.check_password',
+            wraps=check_password
+        ) as mock_check_password:
+            for _ in range(3):
+                res = self.client.post(
+                    TOKEN_URL,
+                    HTTP_AUTHORIZATION=f'Basic {credentials}'
+                )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        mock_check_password.assert_not_called()
+
+    @override_settings(TOKEN_THROTTLE=throttle(email=(1, 60)))
+    def test_throttled_metrics(self):
+        """Test the throttled requests are counted in the measures"""
+        self.post()
+        self.post()
+        self.post()
+
+        measures = metrics.collect()['user:token']
+        self.assertEqual(measures['total']['count'], 3)
+        self.assertEqual(measures['throttled']['total'], 2)
+
+    @override_settings(TOKEN_THROTTLE=throttle(email=(1, 60), enabled=False))
+    def test_throttle_disabled(self):
+        """Test nothing is throttled when disabled"""
+        for _ in range(3):
+            self.assertEqual(self.post().status_code, status.HTTP_200_OK)
@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.throttling import BaseThrottle
+
+
+logger = logging.getLogger(__name__)
+
+
+def take_token(bucket, now, capacity, rate):
+    """Refill a bucket and take a token from it
+        - bucket: (tokens, time of the last refill), None when full
+        - rate: tokens added back per second
+    Return the new bucket and the seconds to wait for a token, 0 when
+    one was taken.
+    """
+    tokens, updated = bucket or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """Token buckets of this process, the least recently used evicted"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take a token of the bucket of the key, see take_token"""
+        with self._lock:
+            bucket, wait = take_token(
+                self._buckets.get(key),
+                time.monotonic(),
+                capacity,
+                rate
+            )
+            self._buckets[key] = bucket
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SharedBucketStore:
+    """Token buckets stored in a Django cache shared by the processes
+
+    The cache has no atomic update of a bucket, concurrent requests of
+    the same key may take the same token, letting a few more through.
+    """
+    GENERATION_KEY = 'throttle:generation'
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def _generation(self, cache):
+        """Return the current generation of the buckets"""
+        generation = cache.get(self.GENERATION_KEY)
+        if generation is None:
+            # add() keeps the generation another process may have just set
+            cache.add(self.GENERATION_KEY, uuid.uuid4().hex, None)
+            generation = cache.get(self.GENERATION_KEY)
+
+        return generation
+
+    def take(self, key, capacity, rate):
+        """Take a token of the bucket of the key, see take_token"""
+        cache = caches[self.alias]
+        key = f'{key}:{self._generation(cache)}'
+        # The clock of every server, not of this process
+        bucket, wait = take_token(
+            cache.get(key),
+            time.time(),
+            capacity,
+            rate
+        )
+        # A missing bucket is full, so it expires once refilled
+        cache.set(key, bucket, (capacity - bucket[0]) / rate + 1)
+
+        return wait
+
+    def clear(self):
+        # The cache is shared with other data, a new generation makes the
+        # old buckets unreachable, they are left to expire once refilled
+        caches[self.alias].set(self.GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+_bucket_store = None
+_bucket_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """Return the bucket store configured in the settings"""
+    global _bucket_store
+    with _bucket_store_lock:
+        if _bucket_store is None:
+            config = settings.TOKEN_THROTTLE
+            if config['CACHE_ALIAS']:
+                _bucket_store = SharedBucketStore(config['CACHE_ALIAS'])
+            else:
+                _bucket_store = LocalBucketStore(config['MAX_SIZE'])
+
+    return _bucket_store
+
+
+def reset_bucket_store():
+    """Forget the bucket store so it is built again from the settings"""
+    global _bucket_store
+    with _bucket_store_lock:
+        _bucket_store = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle taking a token of the bucket of the key of each request
+
+    The capacity and refill rate of the buckets are read from the scope
+    of the throttle in settings.TOKEN_THROTTLE.
+    """
+    scope = None
+
+    def get_key(self, request):
+        """Return the key of the bucket of the request, None to allow it"""
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        config = settings.TOKEN_THROTTLE
+        self.seconds = 0
+        if not config['ENABLED']:
+            return True
+        key = self.get_key(request)
+        if key is None:
+            return True
+
+        bucket = config['RATES'][self.scope]
+        self.seconds = get_bucket_store().take(
+            f'throttle:{self.scope}:{key}',
+            bucket['CAPACITY'],
+            bucket['PER_MINUTE'] / 60
+        )
+        if self.seconds:
+            logger.warning(
+                'Throttled a token request of %s by %s',
+                self.get_ident(request),
+                self.scope
+            )
+
+        return not self.seconds
+
+    def wait(self):
+        return self.seconds
+
+
+class TokenIPThrottle(TokenBucketThrottle):
+    """Limit the token requests of each client IP"""
+    scope = 'ip'
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class TokenEmailThrottle(TokenBucketThrottle):
+    """Limit the token requests of each email, whatever the client"""
+    scope = 'email'
+
+    def get_key(self, request):
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            # Rejected by the serializer without hashing a password
+            return None
+        # Never keep the emails themselves in the buckets
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
@@ -1,8 +1,12 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.throttling import TokenEmailThrottle, TokenIPThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -14,16 +18,25 @@ class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # The credentials are checked by the serializer alone, authenticating
+    # the request would hash a password before the throttles
+    authentication_classes = ()
+    # Checked before the serializer hashes the password
+    throttle_classes = (TokenEmailThrottle, TokenIPThrottle)
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
     # Authentication mechanism by which the authentication happens
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     # Level permission the user needs (only logged in)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return authentication user"""
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        # The user of a cached token may be older than its row, saving
+        # it would write the stale fields back
+        return get_user_model().objects.get(pk=self.request.user.pk)